@@ -1,14 +1,15 @@
 from django.contrib import admin
+from ecommers.admin import SoftDeleteAdminMixin
 from .models import Category, Brand
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'active', 'created_at')
     list_filter = ('active',)
     search_fields = ('name',)
 
 @admin.register(Brand)
-class BrandAdmin(admin.ModelAdmin):
+class BrandAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'active', 'created_at')
     list_filter = ('active',)
     search_fields = ('name',)
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='brand',
+            index=models.Index(condition=models.Q(('active', True)), fields=['name'], name='brand_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(condition=models.Q(('active', True)), fields=['name'], name='category_active_name_idx'),
+        ),
+    ]
@@ -1,28 +1,48 @@
 from django.db import models
 
-class Category(models.Model):
+from ecommers.soft_delete import SoftDeleteManager, SoftDeleteMixin, SoftDeleteQuerySet
+
+class Category(SoftDeleteMixin, models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    soft_delete_field = 'active'
+    soft_delete_cascade = ('products',)
+
     class Meta:
         verbose_name_plural = 'Categories'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name'], name='category_active_name_idx', condition=models.Q(active=True)),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Brand(models.Model):
+class Brand(SoftDeleteMixin, models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     logo = models.TextField(blank=True)  # Si usás imágenes, conviene usar ImageField
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    soft_delete_field = 'active'
+    soft_delete_cascade = ('products',)
+
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name'], name='brand_active_name_idx', condition=models.Q(active=True)),
+        ]
 
     def __str__(self):
         return self.name
@@ -1,7 +1,12 @@
 from rest_framework import serializers
-from .models import Brand
+from .models import Brand, Category
+
+class CategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'description', 'active']
 
 class BrandSerializer(serializers.ModelSerializer):
     class Meta:
         model = Brand
-        fields = ['id', 'name', 'image']
+        fields = ['id', 'name', 'logo']
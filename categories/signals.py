@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from ecommers.versions import bump_table_version
+from .models import Brand, Category
+
+
+# Invalida las respuestas cacheadas del catálogo (ecommers.response_cache). Las
+# bajas en cascada de productos pasan por el save de la categoría/marca.
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def bump_catalog_version(sender, using=None, **kwargs):
+    bump_table_version(sender, using=using)
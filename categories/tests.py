@@ -1,3 +1,36 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from products.models import Product
+from .models import Brand, Category
+
+
+class SoftDeleteCascadeTests(TestCase):
+
+    def test_category_delete_deactivates_its_products(self):
+        category = Category.objects.create(name='Mates')
+        brand = Brand.objects.create(name='Pampa')
+        Product.objects.create(name='Mate', brand=brand, category=category)
+
+        category.delete()
+
+        self.assertFalse(Category.objects.exists())
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Product.all_objects.get().active)
+        self.assertTrue(Brand.objects.filter(pk=brand.pk).exists())
+
+
+class SoftDeleteAdminTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'secreto'))
+
+    def test_soft_deleted_rows_can_be_found_and_restored(self):
+        category = Category.objects.create(name='Mates')
+        brand = Brand.objects.create(name='Pampa')
+        product = Product.objects.create(name='Mate', brand=brand, category=category)
+        category.delete()
+        for url in (f'/admin/categories/category/{category.pk}/change/', f'/admin/products/product/{product.pk}/change/'):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get('/admin/categories/category/', {'active__exact': '0'})
+        self.assertContains(response, 'Mates')
@@ -1,8 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BrandViewSet
+from .views import BrandViewSet, CategoryViewSet
 
 router = DefaultRouter()
+router.register(r'categories', CategoryViewSet)
 router.register(r'brands', BrandViewSet)
 
 urlpatterns = [
@@ -1,7 +1,12 @@
 from rest_framework import viewsets
-from .models import Brand
-from .serializers import BrandSerializer
+from ecommers.response_cache import CachedResponseMixin
+from .models import Brand, Category
+from .serializers import BrandSerializer, CategorySerializer
 
-class BrandViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+
+class BrandViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
@@ -0,0 +1,61 @@
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.utils.functional import cached_property
+
+
+class SoftDeleteAdminMixin:
+    """Muestra también las filas dadas de baja (``all_objects``) en el admin.
+
+    Los widgets de autocompletado solo ofrecen filas activas.
+    """
+
+    def get_queryset(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name == 'autocomplete':
+            queryset = self.model._default_manager.get_queryset()
+        else:
+            queryset = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+
+def estimated_row_count(model, using='default'):
+    """Cantidad de filas según las estadísticas de la base (ANALYZE), o None."""
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        # Savepoint: sin ANALYZE previo sqlite_stat1 no existe.
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+                counts = [int(row[0].split()[0]) for row in cursor.fetchall()]
+                return max(counts) if counts else None
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+                row = cursor.fetchone()
+                return row[0] if row and row[0] >= 0 else None
+    except DatabaseError:
+        return None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator que no hace ``COUNT(*)`` sobre toda la tabla.
+
+    Sin filtros usa la estimación de la base; con filtros cuenta hasta
+    ``count_limit`` filas (``COUNT`` sobre una subconsulta con LIMIT), así el
+    costo queda acotado aunque la tabla tenga millones de filas.
+    """
+
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.count_limit:
+                return estimate
+        return queryset.order_by()[:self.count_limit].count()
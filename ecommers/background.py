@@ -0,0 +1,47 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+from .celery import app as celery_app
+
+logger = logging.getLogger(__name__)
+
+
+def background_task(func):
+    """Registra ``func`` como tarea de Celery (si está instalado) para ``run_in_background``."""
+    func.celery_task = None
+    if celery_app is not None:
+        func.celery_task = celery_app.task(name=f'{func.__module__}.{func.__name__}')(func)
+    return func
+
+
+def _run_in_thread(func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Falló la tarea en segundo plano %s", func.__name__)
+    finally:
+        connections.close_all()
+
+
+def run_in_background(func, *args):
+    """Ejecuta ``func(*args)`` fuera del request.
+
+    Usa el worker de Celery si hay broker; si Celery no está instalado o el
+    broker no responde, la corre en un hilo del proceso. Con
+    ``BACKGROUND_TASKS_EAGER`` (tests) corre en el momento. Devuelve el modo usado.
+    """
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        func(*args)
+        return 'eager'
+    celery_task = getattr(func, 'celery_task', None)
+    if celery_task is not None:
+        try:
+            celery_task.apply_async(args, retry=False)
+            return 'celery'
+        except Exception:
+            logger.warning("Broker de Celery no disponible; %s corre en un hilo local.", func.__name__)
+    threading.Thread(target=_run_in_thread, args=(func, args), daemon=True).start()
+    return 'thread'
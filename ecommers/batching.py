@@ -0,0 +1,74 @@
+import threading
+import weakref
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class _Group:
+
+    def __init__(self, sids):
+        self.sids = sids
+        self.values = []
+        self.done = False
+        self.callback = None
+
+    def pending(self):
+        # Si el savepoint o la transacción vuelven atrás, Django descarta el
+        # callback y la referencia débil queda vacía.
+        return not self.done and self.callback() is not None
+
+
+class CommitBatch(threading.local):
+    """Junta valores durante la transacción y llama una sola vez a
+    ``handler(values, using)`` al confirmarla.
+
+    Los valores se agrupan por savepoint, cada grupo con su ``on_commit``:
+    los de un savepoint que vuelve atrás se descartan con él. Al confirmar,
+    el primer grupo que corre se lleva los que siguen pendientes y el resto
+    ya no tiene nada que hacer. Fuera de una transacción ``handler`` se llama
+    en el momento.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.groups = {}
+
+    def add(self, values, using=DEFAULT_DB_ALIAS):
+        values = list(values)
+        if not values:
+            return
+        connection = connections[using]
+        if not connection.in_atomic_block:
+            self.handler(values, using)
+            return
+        # ``atomic(savepoint=False)`` apila None: no se puede deshacer por separado.
+        sids = frozenset(sid for sid in connection.savepoint_ids if sid)
+        groups = [group for group in self.groups.get(using, ()) if group.pending()]
+        # El último grupo sirve si no hay savepoints nuevos desde que se abrió:
+        # así se descarta exactamente junto con los valores.
+        if groups and sids <= groups[-1].sids:
+            group = groups[-1]
+        else:
+            group = self._open(connection, using, sids)
+            groups.append(group)
+        self.groups[using] = groups
+        group.values.extend(values)
+
+    def _open(self, connection, using, sids):
+        group = _Group(sids)
+
+        def flush():
+            if group.done:
+                return
+            batch = [other for other in self.groups.pop(using, ()) if other is group or other.pending()]
+            if group not in batch:
+                batch.insert(0, group)
+            values = []
+            for member in batch:
+                member.done = True
+                values.extend(member.values)
+            self.handler(values, using)
+
+        group.callback = weakref.ref(flush)
+        connection.on_commit(flush)
+        return group
@@ -0,0 +1,13 @@
+import os
+
+try:
+    from celery import Celery
+except ImportError:  # Celery es opcional: sin él las tareas corren en un hilo local.
+    Celery = None
+
+app = None
+if Celery is not None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommers.settings')
+    app = Celery('ecommers')
+    app.config_from_object('django.conf:settings', namespace='CELERY')
+    app.autodiscover_tasks()
@@ -0,0 +1,53 @@
+import hashlib
+import time
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .versions import table_version
+
+
+class ConditionalGetMixin:
+    """ETag y Last-Modified para ``list``/``retrieve`` a partir de versiones de tabla.
+
+    Si el cliente manda ``If-None-Match`` o ``If-Modified-Since`` y ninguna de
+    las tablas de ``version_models`` cambió, se responde 304 sin ejecutar la
+    consulta ni el serializer. Las tablas tienen que actualizar su versión con
+    ``ecommers.versions.bump_table_version`` en sus señales.
+
+    Last-Modified tiene resolución de segundos: si alguna tabla cambió en el
+    segundo en curso no se manda (ni se acepta ``If-Modified-Since``), porque
+    otra escritura en ese mismo segundo tendría la misma fecha. Queda el ETag.
+    """
+
+    version_models = None
+
+    def get_version_models(self):
+        return self.version_models or (self.queryset.model,)
+
+    def get_conditional_validators(self, request):
+        versions = [table_version(model) for model in self.get_version_models()]
+        raw = '|'.join([request.get_full_path(), request.headers.get('Accept', '')] + [str(v) for v in versions])
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        last_modified = max(versions) // 10 ** 9
+        if last_modified >= int(time.time()):
+            last_modified = None
+        return etag, last_modified
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_conditional_validators(request)
+        not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,365 @@
+import logging
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connections, transaction
+from django.db.models import CharField, F, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Concat, StrIndex
+
+logger = logging.getLogger(__name__)
+
+# Largo mínimo para usar el índice trigram: con menos se recorrería entero.
+MIN_TERM_LENGTH = 3
+
+
+class SearchIndex:
+    """Índice de búsqueda en una tabla aparte, mantenido a mano (señales/servicios).
+
+    - SQLite: tabla virtual FTS5 con tokenizer ``trigram``; busca subcadenas
+      de 3 o más caracteres sin recorrer la tabla del modelo.
+    - PostgreSQL: tabla común con índice GIN ``gin_trgm_ops`` (pg_trgm) y
+      ``ILIKE``.
+
+    En otras bases no se crea la tabla y la búsqueda es un ``icontains``.
+
+    ``document`` es un callable que devuelve la expresión con el texto a
+    indexar para cada fila (se usa en ``annotate``).
+    """
+
+    VENDORS = ('sqlite', 'postgresql')
+
+    def __init__(self, table, document):
+        self.table = table
+        self.document = document
+
+    def supported(self, connection):
+        return connection.vendor in self.VENDORS
+
+    def _key(self, connection):
+        return 'rowid' if connection.vendor == 'sqlite' else 'id'
+
+    def create(self, connection):
+        if not self.supported(connection):
+            logger.warning(
+                "Sin índice de búsqueda %s en %s: se busca con icontains.", self.table, connection.vendor
+            )
+            return
+        table = connection.ops.quote_name(self.table)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(document, tokenize='trigram')"
+                )
+            elif connection.vendor == 'postgresql':
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS {table} (id bigint PRIMARY KEY, document text NOT NULL)'
+                )
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {connection.ops.quote_name(self.table + "_trgm")} '
+                    f'ON {table} USING gin (document gin_trgm_ops)'
+                )
+
+    def drop(self, connection):
+        if not self.supported(connection):
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(self.table)}')
+
+    def columns(self):
+        """Columnas del índice y la expresión que las llena, en orden."""
+        return [('document', self.document())]
+
+    def _insert_sql(self, connection, rows_sql):
+        names = ', '.join(name for name, _ in self.columns())
+        return f'INSERT INTO {connection.ops.quote_name(self.table)} ({self._key(connection)}, {names}) {rows_sql}'
+
+    def index(self, queryset, replace=True):
+        """(Re)indexa las filas de ``queryset`` sin traerlas a Python.
+
+        Con ``replace=False`` (filas nuevas) es un solo INSERT ... SELECT.
+        """
+        using = queryset.db
+        connection = connections[using]
+        if not self.supported(connection):
+            return
+        table = connection.ops.quote_name(self.table)
+        key = self._key(connection)
+        queryset = queryset.order_by()
+        annotations = {f'search_{name}': expression for name, expression in self.columns()}
+        rows_sql, rows_params = (
+            queryset.annotate(**annotations)
+            .values_list('pk', *annotations)
+            .query.get_compiler(using).as_sql()
+        )
+        insert_sql = self._insert_sql(connection, rows_sql)
+        if not replace:
+            with connection.cursor() as cursor:
+                cursor.execute(insert_sql, rows_params)
+            return
+        keys_sql, keys_params = queryset.values('pk').query.get_compiler(using).as_sql()
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE {key} IN ({keys_sql})', keys_params)
+            cursor.execute(insert_sql, rows_params)
+
+    def remove(self, pks, using='default'):
+        pks = list(pks)
+        connection = connections[using]
+        if not pks or not self.supported(connection):
+            return
+        placeholders = ', '.join(['%s'] * len(pks))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connection.ops.quote_name(self.table)} '
+                f'WHERE {self._key(connection)} IN ({placeholders})',
+                pks,
+            )
+
+    def rebuild(self, queryset, chunk_size=10000, stdout=None):
+        """Vacía el índice y lo vuelve a llenar en bloques de ``chunk_size`` pks."""
+        connection = connections[queryset.db]
+        if not self.supported(connection):
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(self.table)}')
+        queryset = queryset.order_by('pk')
+        last = None
+        indexed = 0
+        while True:
+            chunk = queryset if last is None else queryset.filter(pk__gt=last)
+            pks = list(chunk.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return indexed
+            self.index(chunk.filter(pk__lte=pks[-1]), replace=False)
+            last = pks[-1]
+            indexed += len(pks)
+            if stdout is not None:
+                stdout.write(f"{indexed} filas indexadas.")
+
+    def matching(self, text, using='default'):
+        """Subconsulta con las pks que contienen todas las palabras de ``text``.
+
+        Devuelve None si ninguna palabra llega a ``MIN_TERM_LENGTH``.
+        """
+        terms = text.split()
+        long_terms = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+        if not long_terms:
+            return None
+        connection = connections[using]
+        table = connection.ops.quote_name(self.table)
+        if connection.vendor == 'sqlite':
+            # Frases entre comillas (sin sintaxis FTS del usuario); las palabras
+            # cortas solo filtran las filas que ya encontró el MATCH.
+            where = [f'{table} MATCH %s']
+            params = [' '.join('"%s"' % term.replace('"', '""') for term in long_terms)]
+            for term in terms:
+                if len(term) < MIN_TERM_LENGTH:
+                    where.append("document LIKE %s ESCAPE '\\'")
+                    params.append(f'%{_escape_like(term)}%')
+            return RawSQL(f'SELECT rowid FROM {table} WHERE {" AND ".join(where)}', params)
+        where = ' AND '.join(["document ILIKE %s"] * len(terms))
+        return RawSQL(f'SELECT id FROM {table} WHERE {where}', [f'%{_escape_like(term)}%' for term in terms])
+
+    def filter(self, queryset, text):
+        """Filtra ``queryset`` por ``text``; sin palabras de 3+ caracteres no hay resultados."""
+        if not text.strip():
+            return queryset
+        if not self.supported(connections[queryset.db]):
+            return self.fallback(queryset, text)
+        matches = self.matching(text, using=queryset.db)
+        if matches is None:
+            return queryset.none()
+        return queryset.filter(pk__in=matches)
+
+    def fallback(self, queryset, text):
+        """Sin índice: cada palabra con ``icontains`` sobre el documento (recorre la tabla)."""
+        terms = text.split()
+        if not any(len(term) >= MIN_TERM_LENGTH for term in terms):
+            return queryset.none()
+        queryset = queryset.annotate(search_document=self.document())
+        return queryset.filter(*(Q(search_document__icontains=term) for term in terms))
+
+
+WORD = re.compile(r'\w+')
+
+# Palabras que aparecen en casi todas las filas: en la consulta solo agregan
+# costo (con prefijo, ``de*`` recorre medio índice) y no cambian el orden.
+SPANISH_STOPWORDS = frozenset(
+    'a al con de del e el en la las lo los o para por sin su sus un una y'.split()
+)
+
+
+class RankedSearchIndex(SearchIndex):
+    """Índice por palabras con ranking, búsqueda por prefijo y sin acentos.
+
+    - SQLite: FTS5 con tokenizer ``unicode61 remove_diacritics 2``, una
+      columna por campo y ``bm25`` con el peso de cada una como ``rank``.
+    - PostgreSQL: ``tsvector`` con la configuración ``spanish`` + ``unaccent``
+      (raíces en español), pesos A-D según el peso de cada columna, índice
+      GIN y ``ts_rank``.
+
+    ``columns`` es una lista de ``(nombre, campo, peso)``; ``campo`` admite
+    lookups (``'brand__name'``).
+    """
+
+    def __init__(self, table, columns, language='spanish', stopwords=SPANISH_STOPWORDS):
+        super().__init__(table, document=None)
+        self.fields = columns
+        self.language = language
+        self.stopwords = stopwords
+
+    def columns(self):
+        return [(name, F(field)) for name, field, _ in self.fields]
+
+    @property
+    def config(self):
+        return f'{self.table}_config'
+
+    def create(self, connection):
+        if not self.supported(connection):
+            return super().create(connection)
+        table = connection.ops.quote_name(self.table)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                names = ', '.join(name for name, _, _ in self.fields)
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                    f"{names}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+                weights = ', '.join(str(float(weight)) for _, _, weight in self.fields)
+                cursor.execute(f"INSERT INTO {table} ({table}, rank) VALUES ('rank', %s)", [f'bm25({weights})'])
+            elif connection.vendor == 'postgresql':
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+                cursor.execute(
+                    "SELECT 1 FROM pg_ts_config WHERE cfgname = %s", [self.config]
+                )
+                if cursor.fetchone() is None:
+                    config = connection.ops.quote_name(self.config)
+                    cursor.execute(f'CREATE TEXT SEARCH CONFIGURATION {config} (COPY = {self.language})')
+                    cursor.execute(
+                        f'ALTER TEXT SEARCH CONFIGURATION {config} ALTER MAPPING '
+                        f'FOR hword, hword_part, word WITH unaccent, {self.language}_stem'
+                    )
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS {table} (id bigint PRIMARY KEY, document tsvector NOT NULL)'
+                )
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {connection.ops.quote_name(self.table + "_gin")} '
+                    f'ON {table} USING gin (document)'
+                )
+
+    def drop(self, connection):
+        super().drop(connection)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TEXT SEARCH CONFIGURATION IF EXISTS {connection.ops.quote_name(self.config)}')
+
+    def _insert_sql(self, connection, rows_sql):
+        if connection.vendor != 'postgresql':
+            return super()._insert_sql(connection, rows_sql)
+        # Los campos llegan como texto y se convierten acá, cada uno con su peso.
+        names = [name for name, _, _ in self.fields]
+        weights = sorted({weight for _, _, weight in self.fields}, reverse=True)
+        document = ' || '.join(
+            f"setweight(to_tsvector('{self.config}', coalesce(rows.{name}, '')), "
+            f"'{'ABCD'[min(weights.index(weight), 3)]}')"
+            for name, _, weight in self.fields
+        )
+        return (
+            f'INSERT INTO {connection.ops.quote_name(self.table)} (id, document) '
+            f'SELECT rows.pk, {document} FROM ({rows_sql}) AS rows (pk, {", ".join(names)})'
+        )
+
+    def _terms(self, text):
+        # Se ignoran las palabras vacías y las de una letra, salvo que no quede otra.
+        terms = WORD.findall(text.lower())
+        return [term for term in terms if len(term) > 1 and term not in self.stopwords] or terms
+
+    def _query(self, text, connection):
+        """Consulta de palabras con prefijo (todas tienen que aparecer), o None si no hay palabras."""
+        terms = self._terms(text)
+        if not terms:
+            return None
+        if connection.vendor == 'sqlite':
+            return ' '.join(f'"{term}"*' for term in terms)
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def _match_sql(self, connection):
+        table = connection.ops.quote_name(self.table)
+        if connection.vendor == 'sqlite':
+            return f'{table} MATCH %s'
+        return f"document @@ to_tsquery('{self.config}', %s)"
+
+    def matching(self, text, using='default'):
+        connection = connections[using]
+        query = self._query(text, connection)
+        if query is None:
+            return None
+        return RawSQL(
+            f'SELECT {self._key(connection)} FROM {connection.ops.quote_name(self.table)} '
+            f'WHERE {self._match_sql(connection)}',
+            [query],
+        )
+
+    def ranked(self, queryset, text, limit=1000):
+        """pks de ``queryset`` que coinciden con ``text``, de la más relevante a la menos.
+
+        El filtro de ``queryset`` va como EXISTS correlacionado: con un
+        ``IN (...)`` FTS5 resolvería el MATCH una vez por cada pk.
+        """
+        using = queryset.db
+        connection = connections[using]
+        if not self.supported(connection):
+            return list(self.fallback(queryset, text).order_by().values_list('pk', flat=True)[:limit])
+        query = self._query(text, connection)
+        if query is None:
+            return []
+        table = connection.ops.quote_name(self.table)
+        key = f'{table}.{self._key(connection)}'
+        rows_sql, rows_params = (
+            queryset.order_by().filter(pk=RawSQL(key, ())).values('pk')
+            .query.get_compiler(using).as_sql()
+        )
+        if connection.vendor == 'sqlite':
+            order, params = 'rank', [query]
+        else:
+            order, params = f"ts_rank(document, to_tsquery('{self.config}', %s)) DESC", [query, query]
+        sql = (
+            f'SELECT {key} FROM {table} WHERE {self._match_sql(connection)} '
+            f'AND EXISTS ({rows_sql}) ORDER BY {order} LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [params[0], *rows_params, *params[1:], limit])
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, queryset, text, limit=1000):
+        """Hasta ``limit`` filas de ``queryset`` que coinciden con ``text``, ordenadas por relevancia.
+
+        Hace la consulta al índice en el momento; ``search_rank`` es la
+        posición de cada fila en el ranking.
+        """
+        if not text.strip():
+            return queryset
+        pks = self.ranked(queryset, text, limit)
+        if not pks:
+            return queryset.none()
+        positions = Value(',%s,' % ','.join(str(pk) for pk in pks))
+        return queryset.filter(pk__in=pks).annotate(
+            search_rank=StrIndex(positions, Concat(Value(','), Cast('pk', CharField()), Value(',')))
+        ).order_by('search_rank')
+
+    def fallback(self, queryset, text):
+        """Sin índice: cada palabra en alguna de las columnas, con ``icontains`` y sin ranking."""
+        terms = self._terms(text)
+        if not terms:
+            return queryset.none()
+        return queryset.filter(*(
+            reduce(or_, (Q(**{f'{field}__icontains': term}) for _, field, _ in self.fields))
+            for term in terms
+        ))
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
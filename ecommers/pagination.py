@@ -0,0 +1,43 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    # Keyset sobre (created_at, id): cada página cuesta lo mismo que la
+    # primera y no se ejecuta COUNT(*).
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class IdCursorPagination(CursorPagination):
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class DateCursorPagination(CursorPagination):
+    # Para modelos con ``date`` en lugar de ``created_at`` (products.Product).
+    ordering = ('-date', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class OptInPageNumberMixin:
+    """Usa paginación por cursor salvo que se pida ``?page=`` o ``?pagination=page``."""
+
+    page_number_pagination_class = PageNumberPagination
+
+    def wants_page_number(self):
+        params = self.request.query_params
+        return 'page' in params or params.get('pagination') == 'page'
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request is not None and self.wants_page_number():
+                self._paginator = self.page_number_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
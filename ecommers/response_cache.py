@@ -0,0 +1,91 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .versions import table_version
+
+MISSING = object()
+
+
+def versioned_key(prefix, models, *parts):
+    """Clave con las versiones de ``models``: cualquier escritura en esas
+    tablas (``bump_table_version``) hace que la clave anterior deje de usarse.
+
+    Devuelve ``(clave, clave_sin_versión)``; la segunda guarda la última copia
+    calculada para servirla mientras otro proceso recalcula.
+    """
+    raw = '|'.join(str(part) for part in parts)
+    versions = '|'.join(str(table_version(model)) for model in models)
+    base = f'{prefix}:{hashlib.md5(raw.encode()).hexdigest()}'
+    return f'{base}:{hashlib.md5(versions.encode()).hexdigest()}', f'{base}:latest'
+
+
+def get_or_compute(keys, compute, timeout=None):
+    """Valor cacheado de ``keys`` (ver ``versioned_key``) o ``compute()``.
+
+    Single-flight: si la clave no está, solo el proceso que toma el lock
+    recalcula. Los demás devuelven la copia anterior si hay, o esperan hasta
+    ``CATALOG_CACHE_WAIT`` segundos a que aparezca antes de calcular por su
+    cuenta.
+    """
+    key, latest_key = keys
+    value = cache.get(key, MISSING)
+    if value is not MISSING:
+        return value
+    timeout = settings.CATALOG_CACHE_TIMEOUT if timeout is None else timeout
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, True, settings.CATALOG_CACHE_LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set_many({key: value, latest_key: value}, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    stale = cache.get(latest_key, MISSING)
+    if stale is not MISSING:
+        return stale
+    deadline = time.monotonic() + settings.CATALOG_CACHE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = cache.get(key, MISSING)
+        if value is not MISSING:
+            return value
+    return compute()
+
+
+class CachedResponseMixin:
+    """Cachea los datos de ``list``/``retrieve`` con claves versionadas por tabla.
+
+    Se guardan ``response.data`` y el status, no el contenido renderizado, así
+    la misma entrada sirve para JSON y para la API navegable. Las tablas de
+    ``cache_models`` tienen que actualizar su versión en sus señales.
+    """
+
+    cache_models = None
+    cache_timeout = None
+
+    def get_cache_models(self):
+        return self.cache_models or (self.queryset.model,)
+
+    def _cached(self, handler, request, *args, **kwargs):
+        keys = versioned_key(
+            # URL absoluta: los links de paginación la incluyen.
+            f'response:{type(self).__name__}:{self.action}', self.get_cache_models(), request.build_absolute_uri()
+        )
+
+        def compute():
+            response = handler(request, *args, **kwargs)
+            return response.status_code, response.data
+
+        status, data = get_or_compute(keys, compute, self.cache_timeout)
+        return Response(data, status=status)
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,76 @@
+def _query_list(request, name):
+    if request is None or name not in request.query_params:
+        return None
+    value = request.query_params.get(name, '')
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def _fields_tree(names):
+    tree = {}
+    for name in names:
+        node = tree
+        for part in name.split('.'):
+            node = node.setdefault(part, {})
+    return tree
+
+
+class SparseFieldsetMixin:
+    """Permite elegir campos con ``?fields=`` y colapsar/expandir relaciones con ``?expand=``.
+
+    - ``?fields=a,b,items.c`` devuelve solo esos campos (con ``.`` se elige
+      dentro de un serializer anidado).
+    - Los ``expandable_fields`` se incluyen siempre que no se pase ni
+      ``fields`` ni ``expand``; si se pasa alguno de los dos, solo cuando se
+      piden. ``?expand=`` vacío colapsa todo.
+    - ``expand_aliases`` agrupa varios campos bajo un nombre (``items``).
+    """
+
+    expandable_fields = ()
+    expand_aliases = {}
+
+    @classmethod
+    def requested_fields(cls, request, names, path=()):
+        """Nombres de ``names`` que se van a serializar para este request."""
+        fields = _query_list(request, 'fields')
+        expand = _query_list(request, 'expand')
+
+        tree = _fields_tree(fields) if fields else None
+        for part in path:
+            tree = tree.get(part) if tree else None
+        if not tree:
+            tree = None
+
+        if path:
+            # Los anidados solo se recortan por ``fields``; ``expand`` aplica a la raíz.
+            return [name for name in names if tree is None or name in tree]
+
+        expanded = set()
+        for name in expand or ():
+            expanded.update(cls.expand_aliases.get(name, (name,)))
+
+        selected = []
+        for name in names:
+            if tree is not None and name not in tree and name not in expanded:
+                continue
+            if name in cls.expandable_fields and (fields is not None or expand is not None):
+                if name not in expanded and (tree is None or name not in tree):
+                    continue
+            selected.append(name)
+        return selected
+
+    def _field_path(self):
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return tuple(reversed(path))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return fields
+        keep = self.requested_fields(request, list(fields), self._field_path())
+        return {name: field for name, field in fields.items() if name in keep}
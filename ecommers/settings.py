@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
 
@@ -86,6 +87,31 @@ DATABASES = {
     }
 }
 
+# Cache: en memoria por proceso salvo que se indique CACHE_REDIS_URL (Redis,
+# compartida por todos los nodos) o CACHE_DIR (archivos, compartida por los
+# workers de un mismo nodo). Las versiones de tabla de ecommers.versions
+# también viven acá.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ecommers',
+    }
+}
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['CACHE_REDIS_URL'],
+    }
+elif os.environ.get('CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['CACHE_DIR'],
+    }
+# Versiones de tablas (ecommers.versions): con la LocMemCache de arriba cada
+# worker tiene las suyas, así que vencen a los N segundos para que los
+# cambios hechos en otro proceso se vean igual. Con Redis/archivos no vencen.
+TABLE_VERSION_LOCAL_TTL = 5
+
 # Validadores de contraseña
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -169,6 +195,59 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'America/Argentina/Cordoba'
 
+# Numeración de órdenes (ver orders.services.numbering)
+ORDER_NUMBER_PREFIX = os.environ.get('ORDER_NUMBER_PREFIX', 'ORD')
+ORDER_NUMBER_PER_COMPANY = False
+ORDER_NUMBER_WIDTH = 6
+ORDER_NUMBER_BLOCK_SIZE = 50
+
+# Máximo de órdenes por request en /orders/bulk/
+ORDER_BULK_MAX_BATCH = 1000
+
+# Respuestas guardadas para reintentos con Idempotency-Key
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# Tras este tiempo sin respuesta, el request original se da por muerto y la
+# clave se puede reintentar.
+IDEMPOTENCY_LOCK_TIMEOUT = timedelta(minutes=2)
+
+# Archivo de órdenes viejas/inactivas (ver orders.services.archive). Con
+# ARCHIVE_DB_PATH las tablas de archivo van a otra base SQLite.
+ORDER_ARCHIVE_AFTER = timedelta(days=730)
+ORDER_ARCHIVE_STATUSES = ['delivered', 'cancelled']
+ARCHIVE_DATABASE = 'default'
+if os.environ.get('ARCHIVE_DB_PATH'):
+    DATABASES['archive'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['ARCHIVE_DB_PATH'],
+    }
+    ARCHIVE_DATABASE = 'archive'
+DATABASE_ROUTERS = ['orders.routers.ArchiveRouter']
+
+# Acciones del admin en segundo plano (orders.jobs): hasta ADMIN_JOB_SYNC_LIMIT
+# órdenes se procesan en el request; más que eso van a Celery o a un hilo local.
+ADMIN_JOB_SYNC_LIMIT = 500
+ADMIN_JOB_CHUNK_SIZE = 2000
+ADMIN_JOB_EXPORT_DIR = BASE_DIR / 'exports'
+# Segundos sin avance tras los que un AdminJob se da por abandonado
+# (orders.jobs.sweep_stale_jobs).
+ADMIN_JOB_STALE_AFTER = 600
+BACKGROUND_TASKS_EAGER = False
+
+# Segundos que el admin de órdenes cachea las opciones de filtros (ciudades)
+ORDER_ADMIN_FACET_TIMEOUT = 600
+
+# Cache de respuestas del catálogo (ecommers.response_cache): segundos de
+# vida de cada entrada, del lock de recálculo y de espera de quien no lo tiene.
+CATALOG_CACHE_TIMEOUT = 300
+CATALOG_CACHE_LOCK_TIMEOUT = 30
+CATALOG_CACHE_WAIT = 2
+
+# Auditoría de productos (products.audit): filas por INSERT al volcar las
+# entradas de una transacción y si el volcado va a Celery/un hilo en vez de
+# correr dentro del commit.
+AUDIT_BATCH_SIZE = 1000
+AUDIT_FLUSH_IN_BACKGROUND = os.environ.get('AUDIT_FLUSH_IN_BACKGROUND', '') == '1'
+
 # Dashboard config
 DASHBOARD_CONFIG = {
     'ITEMS_PER_PAGE': 20,
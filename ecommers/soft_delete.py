@@ -0,0 +1,82 @@
+from django.db import models, transaction
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    """``delete()`` marca las filas como inactivas con un UPDATE en vez de borrarlas.
+
+    El modelo indica la columna en ``soft_delete_field`` y, en
+    ``soft_delete_cascade``, las relaciones inversas que se dan de baja junto
+    con él (el equivalente a ``on_delete=CASCADE``). ``hard_delete()`` borra
+    de verdad.
+    """
+
+    def _soft_delete_field(self):
+        return self.model.soft_delete_field
+
+    def alive(self):
+        return self.filter(**{self._soft_delete_field(): True})
+
+    def dead(self):
+        return self.filter(**{self._soft_delete_field(): False})
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            counts = self._soft_delete()
+        return sum(counts.values()), counts
+
+    def _soft_delete(self, cascaded=False):
+        """Da de baja las filas y sus relaciones en cascada, dentro del atomic de quien llama."""
+        counts = {}
+        for name in self.model.soft_delete_cascade:
+            relation = self.model._meta.get_field(name)
+            children = relation.related_model._default_manager.using(self.db).filter(**{
+                f'{relation.field.name}__in': self.order_by().values('pk'),
+            })
+            for label, count in children._soft_delete(cascaded=True).items():
+                counts[label] = counts.get(label, 0) + count
+        rows = self._mark_inactive(cascaded)
+        if rows:
+            counts[self.model._meta.label] = rows
+        return counts
+
+    def _mark_inactive(self, cascaded=False):
+        """El UPDATE de la baja. ``cascaded``: las filas caen junto con su padre."""
+        field = self._soft_delete_field()
+        return self.filter(**{field: True}).update(**{field: False})
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def hard_delete(self):
+        return super().delete()
+
+    hard_delete.alters_data = True
+    hard_delete.queryset_only = True
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Manager por defecto: solo filas activas. ``all_objects`` ve también las bajas."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{self.model.soft_delete_field: True})
+
+
+class SoftDeleteMixin:
+    soft_delete_field = 'is_active'
+    soft_delete_cascade = ()
+
+    def delete(self, using=None, keep_parents=False):
+        with transaction.atomic(using=using):
+            for name in self.soft_delete_cascade:
+                getattr(self, name).all()._soft_delete(cascaded=True)
+            setattr(self, self.soft_delete_field, False)
+            # Pasa por save() para que los modelos con lógica propia (totales de
+            # órdenes, auditoría) vean la baja como cualquier otra escritura.
+            self.save(using=using, update_fields=[self.soft_delete_field])
+
+    delete.alters_data = True
+
+    def hard_delete(self, using=None, keep_parents=False):
+        return super().delete(using=using, keep_parents=keep_parents)
+
+    hard_delete.alters_data = True
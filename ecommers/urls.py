@@ -23,10 +23,11 @@ urlpatterns = [
     # Admin de Django
     path('admin/', admin.site.urls),
 
-    # API - cuentas, perfiles, productos, carrito, pagos, pedidos
+    # API - cuentas, perfiles, productos, categorías y marcas, carrito, pagos, pedidos
     path('api/accounts/', include('accounts.urls')),
     path('api/profile/', include('profiles.urls')),
     path('api/products/', include('products.urls')),
+    path('api/categories/', include('categories.urls')),
     #path('api/cart/', include('cart.urls')),
     #path('api/checkout/', include('checkout.urls')),
     #path('api/payments/', include('payments.urls')),
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+VERSION_KEY = 'table-version:{}'
+
+
+def _key(model):
+    return VERSION_KEY.format(model._meta.label_lower)
+
+
+def versions_are_shared():
+    """Si CACHES es visible para todos los procesos (Redis, Memcached, archivos)."""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def _timeout():
+    # Con una cache por proceso, un cambio hecho en otro worker no llega
+    # nunca: la versión vence sola a los TABLE_VERSION_LOCAL_TTL segundos.
+    return None if versions_are_shared() else settings.TABLE_VERSION_LOCAL_TTL
+
+
+def table_version(model):
+    """Versión actual de la tabla de ``model``, compartida entre procesos vía cache.
+
+    Es un timestamp en nanosegundos del último cambio registrado, así que sirve
+    también como fecha de última modificación. Si CACHES es LocMemCache, la
+    invalidación entre workers se reduce a ``TABLE_VERSION_LOCAL_TTL``.
+    """
+    key = _key(model)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), _timeout())
+        version = cache.get(key)
+    return version
+
+
+def bump_table_version(model, using=None):
+    # Se incrementa ya y otra vez al confirmar la transacción, para que nadie
+    # quede con datos sin confirmar guardados bajo la versión nueva.
+    cache.set(_key(model), time.time_ns(), _timeout())
+    transaction.on_commit(lambda: cache.set(_key(model), time.time_ns(), _timeout()), using=using)
@@ -1,24 +1,85 @@
-from django.contrib import admin
+import datetime
+import json
+import os
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.utils import unquote
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, Http404, HttpResponseRedirect
+from django.utils import timezone
 from django.utils.html import format_html
-from django.urls import reverse
+from django.urls import path, reverse
+from ecommers.admin import EstimatedCountPaginator, SoftDeleteAdminMixin
 from .models import (
     Product, PaymentMethod, PaymentStatus, Persona, Company,
-    FiscalCondition, CardInfo, Order, OrderDetail, OrderDetailCard
+    FiscalCondition, CardInfo, FinancingPlan, Order, OrderDetail, OrderDetailCard, OrderStatusHistory,
+    ArchivedOrder, ArchivedOrderItem, AdminJob
 )
+from .jobs import export_path, start_job, sweep_stale_jobs
+from .reference_data import reference_data
+from .search import order_search
+from .services.archive import find_archived_order
+from .services.transitions import transition_orders
 
 # -------- INLINES -------- #
 
-class OrderDetailInline(admin.TabularInline):
+class PaginatedInlineMixin:
+    """Muestra los items de a ``per_page`` con ``?<page_param>=N`` en la URL.
+
+    El formulario se envía a la misma URL, así que al guardar se procesa la
+    misma página que se editó.
+    """
+
+    template = 'admin/edit_inline/paginated_tabular.html'
+    per_page = 20
+    page_param = 'items_page'
+    parent_field = 'order'
+
+    def _page_url(self, request, page):
+        params = request.GET.copy()
+        params[self.page_param] = page
+        return f'?{params.urlencode()}'
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        self.page, self.previous_page_url, self.next_page_url = 1, None, None
+        match = request.resolver_match
+        object_id = match.kwargs.get('object_id') if match else None
+        if object_id is None:
+            return queryset
+        try:
+            self.page = max(1, int(request.GET.get(self.page_param, 1)))
+        except ValueError:
+            self.page = 1
+        # Un item de más para saber si hay página siguiente sin COUNT(*).
+        offset = (self.page - 1) * self.per_page
+        ids = list(
+            queryset.filter(**{f'{self.parent_field}_id': unquote(object_id)})
+            .order_by('pk').values_list('pk', flat=True)[offset:offset + self.per_page + 1]
+        )
+        if self.page > 1:
+            self.previous_page_url = self._page_url(request, self.page - 1)
+        if len(ids) > self.per_page:
+            self.next_page_url = self._page_url(request, self.page + 1)
+        return queryset.filter(pk__in=ids[:self.per_page])
+
+
+class OrderDetailInline(PaginatedInlineMixin, admin.TabularInline):
     model = OrderDetail
     extra = 0
     fields = ['product', 'quantity', 'unit_price', 'subtotal']
     readonly_fields = ['subtotal']
+    autocomplete_fields = ['product']
     show_change_link = True
 
 
-class OrderDetailCardInline(admin.TabularInline):
+class OrderDetailCardInline(PaginatedInlineMixin, admin.TabularInline):
     model = OrderDetailCard
+    page_param = 'card_items_page'
     extra = 0
+    autocomplete_fields = ['product', 'card_info']
     fields = [
         'product', 'card_info', 'quantity', 'unit_price', 'offer',
         'discount', 'cuotas', 'installments', 'unit_price_with_offer',
@@ -27,21 +88,131 @@ class OrderDetailCardInline(admin.TabularInline):
     readonly_fields = ['unit_price_with_offer', 'subtotal', 'total_installments']
     show_change_link = True
 
+# -------- FILTROS -------- #
+# Ninguno recorre la tabla de órdenes: las opciones salen de caches o de
+# búsquedas puntuales en índices.
+
+def shipping_city_facets(limit=200):
+    """Ciudades distintas, cacheadas; una búsqueda en order_city_idx por ciudad."""
+    def load():
+        cities = []
+        queryset = Order.all_objects.order_by('shipping_city').values_list('shipping_city', flat=True)
+        city = queryset.first()
+        while city is not None and len(cities) < limit:
+            cities.append(city)
+            city = queryset.filter(shipping_city__gt=city).first()
+        return cities
+    return cache.get_or_set('orders:admin:shipping-cities', load, settings.ORDER_ADMIN_FACET_TIMEOUT)
+
+
+class ShippingCityFilter(admin.SimpleListFilter):
+    title = 'ciudad de envío'
+    parameter_name = 'shipping_city'
+
+    def lookups(self, request, model_admin):
+        return [(city, city or '(sin ciudad)') for city in shipping_city_facets()]
+
+    def queryset(self, request, queryset):
+        if self.value() is not None:
+            return queryset.filter(shipping_city=self.value())
+        return queryset
+
+
+class PaymentStatusFilter(admin.SimpleListFilter):
+    title = 'estado de pago'
+    parameter_name = 'payment_status'
+
+    def lookups(self, request, model_admin):
+        statuses = sorted(reference_data.all(PaymentStatus), key=lambda status: status.name)
+        return [(str(status.pk), status.name) for status in statuses]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(payment_status_id=self.value())
+        return queryset
+
+
+class CreatedAtFilter(admin.SimpleListFilter):
+    """Jerarquía de fechas (año / mes) sin ``SELECT DISTINCT`` sobre created_at.
+
+    Los años van de la orden más vieja a la más nueva (dos búsquedas en el
+    índice); los meses se generan sin consultar.
+    """
+
+    title = 'fecha de creación'
+    parameter_name = 'created'
+
+    def _year_range(self):
+        dates = Order.all_objects.values_list('created_at', flat=True)
+        first = dates.order_by('created_at').first()
+        last = dates.order_by('-created_at').first()
+        if first is None:
+            return []
+        return range(timezone.localtime(last).year, timezone.localtime(first).year - 1, -1)
+
+    def _selected(self):
+        try:
+            parts = [int(part) for part in (self.value() or '').split('-')]
+        except ValueError:
+            return None
+        # El rango de un año termina el 1/1 del siguiente: MAXYEAR no tiene fin representable.
+        if not parts or not datetime.MINYEAR < parts[0] < datetime.MAXYEAR:
+            return None
+        if len(parts) == 1:
+            return parts[0], None
+        if len(parts) == 2 and 1 <= parts[1] <= 12:
+            return parts[0], parts[1]
+        return None
+
+    def lookups(self, request, model_admin):
+        selected = self._selected() if self.value() else None
+        if selected is None:
+            return [(str(year), str(year)) for year in self._year_range()]
+        year = selected[0]
+        return [(str(year), f'{year} (todo el año)')] + [
+            (f'{year}-{month:02d}', f'{year}-{month:02d}') for month in range(1, 13)
+        ]
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        selected = self._selected()
+        if selected is None:
+            return queryset.none()
+        year, month = selected
+        start = datetime.datetime(year, month or 1, 1)
+        if month is None or month == 12:
+            end = datetime.datetime(year + 1, 1, 1)
+        else:
+            end = datetime.datetime(year, month + 1, 1)
+        return queryset.filter(
+            created_at__gte=timezone.make_aware(start), created_at__lt=timezone.make_aware(end)
+        )
+
+
 # -------- ORDER ADMIN -------- #
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = [
         'order_number', 'user', 'status_badge', 'payment_status_badge',
         'total', 'created_at', 'view_details_link'
     ]
     
-    list_filter = ['status', 'payment_status', 'created_at', 'shipping_city']
+    list_filter = ['status', PaymentStatusFilter, CreatedAtFilter, ShippingCityFilter]
+    list_select_related = ['user']
     search_fields = ['order_number', 'user__username', 'user__email', 'shipping_phone']
-    readonly_fields = ['order_number', 'created_at', 'total']
-    date_hierarchy = 'created_at'
+    readonly_fields = ['order_number', 'created_at', 'total_standard', 'total_card', 'total']
+    autocomplete_fields = ['user', 'company', 'persona']
+    ordering = ['-created_at', '-id']
+    # Sin COUNT(*) exacto: estimación o conteo acotado (EstimatedCountPaginator).
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [OrderDetailInline, OrderDetailCardInline]
-    actions = ['mark_as_confirmed', 'mark_as_shipped', 'mark_as_delivered']
+    actions = [
+        'mark_as_confirmed', 'mark_as_shipped', 'mark_as_delivered',
+        'export_selected', 'recompute_totals',
+    ]
 
     fieldsets = (
         ('Información General', {
@@ -57,7 +228,7 @@ class OrderAdmin(admin.ModelAdmin):
             )
         }),
         ('Totales', {
-            'fields': ('shipping_cost', 'tax_amount', 'total')
+            'fields': ('shipping_cost', 'tax_amount', 'total_standard', 'total_card', 'total')
         }),
         ('Facturación', {
             'fields': ('fiscal_condition', 'company', 'persona')
@@ -82,50 +253,229 @@ class OrderAdmin(admin.ModelAdmin):
         colors = {
             'paid': '#28a745', 'pending': '#ffc107', 'failed': '#dc3545'
         }
-        color = colors.get(obj.payment_status, '#6c757d')
+        # payment_status es FK: el nombre sale del cache de tablas de referencia.
+        payment_status = reference_data.get(PaymentStatus, obj.payment_status_id)
+        name = payment_status.name if payment_status else str(obj.payment_status_id)
+        color = colors.get(name, '#6c757d')
         return format_html('<span style="color:white;background:{};padding:4px;border-radius:4px;">{}</span>',
-                           color, obj.get_payment_status_display())
+                           color, name)
     payment_status_badge.short_description = 'Pago'
 
     def view_details_link(self, obj):
         url = reverse('admin:orders_order_change', args=[obj.id])
-        return format_html('<a href="{}">Ver detalles</a>', url)
+        return format_html('<a href="{}?summary=1">Ver detalles</a>', url)
     view_details_link.short_description = 'Detalles'
 
+    # -------- RESUMEN (?summary=1) -------- #
+    # Ficha de solo lectura sin inlines: los totales salen de las columnas
+    # guardadas, sin leer los items.
+    def _is_summary(self, request):
+        match = request.resolver_match
+        return (
+            request.GET.get('summary') == '1'
+            and match is not None and match.url_name == 'orders_order_change'
+        )
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self._is_summary(request):
+            queryset = queryset.select_related('user', 'company', 'persona', 'payment_status', 'fiscal_condition')
+        return queryset
+
+    def get_inlines(self, request, obj):
+        if obj is not None and self._is_summary(request):
+            return []
+        return super().get_inlines(request, obj)
+
+    def has_change_permission(self, request, obj=None):
+        if obj is not None and self._is_summary(request):
+            return False
+        return super().has_change_permission(request, obj)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Índice de texto (orders.search) en vez de icontains con JOIN a auth_user.
+        return order_search.filter(queryset, search_term), False
+
+    def _get_obj_does_not_exist_redirect(self, request, opts, object_id):
+        # Links viejos a órdenes ya archivadas van a su ficha de solo lectura.
+        archived = find_archived_order(pk=object_id) if str(object_id).isdigit() else None
+        if archived is None:
+            return super()._get_obj_does_not_exist_redirect(request, opts, object_id)
+        self.message_user(request, f"La orden {archived.order_number} está archivada.", messages.INFO)
+        return HttpResponseRedirect(reverse('admin:orders_archivedorder_change', args=[archived.pk]))
+
     # -------- ACCIONES PERSONALIZADAS -------- #
+    # Las selecciones grandes y los procesos largos van a un AdminJob en
+    # segundo plano (orders.jobs); el avance se ve en el admin de AdminJob.
+    def _start_job(self, request, kind, ids, description, **params):
+        job = start_job(kind, ids, user=request.user, **params)
+        url = reverse('admin:orders_adminjob_change', args=[job.pk])
+        self.message_user(
+            request,
+            format_html('{} de {} orden(es) en segundo plano: <a href="{}">ver avance</a>.',
+                        description, job.total, url),
+        )
+
+    def _transition(self, request, queryset, to_status, label):
+        ids = list(queryset.values_list('pk', flat=True))
+        if len(ids) > settings.ADMIN_JOB_SYNC_LIMIT:
+            # Los mismos ids que se contaron: volver a consultar podría traer otros.
+            self._start_job(request, 'transition', ids, f"Cambio a {label}", status=to_status)
+            return
+        updated, skipped = transition_orders(ids, to_status, user=request.user)
+        self.message_user(request, f"{updated} orden(es) marcadas como {label}.")
+        if skipped:
+            self.message_user(
+                request,
+                f"{len(skipped)} orden(es) no admiten ese cambio de estado y no se modificaron.",
+                level=messages.WARNING,
+            )
+
     def mark_as_confirmed(self, request, queryset):
-        updated = queryset.update(status='confirmed')
-        self.message_user(request, f"{updated} orden(es) marcadas como confirmadas.")
+        self._transition(request, queryset, 'confirmed', 'confirmadas')
     mark_as_confirmed.short_description = "Marcar como Confirmadas"
 
     def mark_as_shipped(self, request, queryset):
-        updated = queryset.update(status='shipped')
-        self.message_user(request, f"{updated} orden(es) marcadas como enviadas.")
+        self._transition(request, queryset, 'shipped', 'enviadas')
     mark_as_shipped.short_description = "Marcar como Enviadas"
 
     def mark_as_delivered(self, request, queryset):
-        updated = queryset.update(status='delivered')
-        self.message_user(request, f"{updated} orden(es) marcadas como entregadas.")
+        self._transition(request, queryset, 'delivered', 'entregadas')
     mark_as_delivered.short_description = "Marcar como Entregadas"
 
+    def export_selected(self, request, queryset):
+        self._start_job(request, 'export', queryset.values_list('pk', flat=True), "Exportación")
+    export_selected.short_description = "Exportar a CSV"
+
+    def recompute_totals(self, request, queryset):
+        self._start_job(
+            request, 'recompute_totals', queryset.values_list('pk', flat=True), "Recálculo de totales"
+        )
+    recompute_totals.short_description = "Recalcular totales"
+
+
+# -------- TAREAS EN SEGUNDO PLANO -------- #
+
+@admin.register(AdminJob)
+class AdminJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress_bar', 'created_by', 'created_at', 'finished_at', 'download_link']
+    list_filter = ['kind', 'status']
+    fields = [
+        'kind', 'status', 'progress_bar', 'params', 'result', 'error',
+        'created_by', 'created_at', 'started_at', 'heartbeat_at', 'finished_at', 'download_link',
+    ]
+    readonly_fields = fields
+
+    def changelist_view(self, request, extra_context=None):
+        # Un job de un worker que murió no debe quedar "en curso" para siempre.
+        sweep_stale_jobs()
+        return super().changelist_view(request, extra_context)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def progress_bar(self, obj):
+        return format_html(
+            '<progress value="{}" max="100"></progress> {} / {}', obj.progress, obj.processed, obj.total
+        )
+    progress_bar.short_description = 'Avance'
+
+    def download_link(self, obj):
+        if obj.kind != 'export' or obj.status != 'done':
+            return '-'
+        url = reverse('admin:orders_adminjob_download', args=[obj.pk])
+        return format_html('<a href="{}">Descargar</a>', url)
+    download_link.short_description = 'Archivo'
+
+    def get_urls(self):
+        urls = [
+            path('<int:job_id>/download/', self.admin_site.admin_view(self.download_view),
+                 name='orders_adminjob_download'),
+        ]
+        return urls + super().get_urls()
+
+    def download_view(self, request, job_id):
+        job = AdminJob.objects.filter(pk=job_id, kind='export', status='done').first()
+        if job is None or not self.has_view_permission(request, job) or not os.path.exists(export_path(job)):
+            raise Http404
+        return FileResponse(open(export_path(job), 'rb'), as_attachment=True, filename=os.path.basename(export_path(job)))
+
+
+# -------- ARCHIVO -------- #
+
+class ReadOnlyArchiveAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def data_pretty(self, obj):
+        return format_html('<pre>{}</pre>', json.dumps(obj.data, indent=2, cls=DjangoJSONEncoder))
+    data_pretty.short_description = 'Datos'
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(ReadOnlyArchiveAdmin):
+    list_display = ['order_number', 'user_id', 'status', 'is_active', 'created_at', 'archived_at']
+    list_filter = ['status']
+    search_fields = ['=order_number', '=id']
+    ordering = ['-created_at']
+    show_full_result_count = False
+    fields = ['id', 'order_number', 'user_id', 'status', 'is_active', 'created_at', 'archived_at', 'data_pretty']
+    readonly_fields = fields
+
+
+@admin.register(ArchivedOrderItem)
+class ArchivedOrderItemAdmin(ReadOnlyArchiveAdmin):
+    list_display = ['item_type', 'item_id', 'order_id', 'archived_at']
+    list_filter = ['item_type']
+    search_fields = ['=order_id']
+    fields = ['item_type', 'item_id', 'order_id', 'archived_at', 'data_pretty']
+    readonly_fields = fields
+
 
 # -------- DEMÁS MODELOS -------- #
 
+@admin.register(OrderStatusHistory)
+class OrderStatusHistoryAdmin(admin.ModelAdmin):
+    list_display = ['order', 'from_status', 'to_status', 'changed_by', 'changed_at']
+    list_filter = ['to_status']
+    raw_id_fields = ['order', 'changed_by']
+
+
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'price', 'is_active']
     search_fields = ['name']
     list_filter = ['is_active']
 
 
 @admin.register(CardInfo)
-class CardInfoAdmin(admin.ModelAdmin):
+class CardInfoAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ['card_holder', 'payment_method', 'card_number', 'expiration', 'is_active']
     search_fields = ['card_holder', 'card_number']
     list_filter = ['payment_method', 'is_active']
 
 
+@admin.register(FinancingPlan)
+class FinancingPlanAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    list_display = ['payment_method', 'installments', 'interest_rate', 'surcharge', 'rounding', 'is_active']
+    list_filter = ['payment_method', 'is_active']
+    list_editable = ['interest_rate', 'surcharge', 'rounding']
+
+
 # Registro directo para tablas de referencia
+class ReferenceAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    search_fields = ['name']
+
+
 simple_models = [PaymentMethod, PaymentStatus, Persona, Company, FiscalCondition]
 for model in simple_models:
-    admin.site.register(model)
+    admin.site.register(model, ReferenceAdmin)
@@ -0,0 +1,139 @@
+import datetime
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    raw = f'{request.method}\n{request.path}\n{body}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _run(record, view_method, self, request, args, kwargs):
+    """Corre la vista con la clave tomada y guarda su respuesta."""
+    try:
+        response = view_method(self, request, *args, **kwargs)
+    except Exception:
+        record.delete()
+        raise
+    if response.status_code >= 500:
+        record.delete()
+    else:
+        record.status_code = response.status_code
+        record.response_body = response.data
+        record.save(update_fields=['status_code', 'response_body'])
+    return response
+
+
+def _take_over(record, fingerprint, now, ttl):
+    """Toma la clave de un request que quedó en curso más que ``IDEMPOTENCY_LOCK_TIMEOUT``.
+
+    Si el proceso murió a mitad del request nadie la libera; el UPDATE
+    condicional deja que solo un reintento la tome.
+    """
+    lock_timeout = getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', datetime.timedelta(minutes=2))
+    if record.created_at > now - lock_timeout:
+        return False
+    taken = IdempotencyKey.objects.filter(
+        pk=record.pk, status_code__isnull=True, created_at=record.created_at
+    ).update(created_at=now, fingerprint=fingerprint, expires_at=now + ttl)
+    if taken:
+        record.created_at, record.fingerprint, record.expires_at = now, fingerprint, now + ttl
+    return bool(taken)
+
+
+def idempotent(view_method):
+    """Hace idempotente un método de escritura de un viewset con el header ``Idempotency-Key``.
+
+    El primer request guarda su respuesta; un reintento con la misma clave y
+    el mismo contenido la recibe de nuevo sin volver a ejecutar la vista.
+    Reusar la clave con otro contenido devuelve 422 y un reintento mientras el
+    original sigue en curso devuelve 409, salvo que lleve más de
+    ``IDEMPOTENCY_LOCK_TIMEOUT`` sin terminar: entonces se vuelve a ejecutar.
+    Las respuestas 5xx no se guardan.
+    """
+    max_length = IdempotencyKey._meta.get_field('key').max_length
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > max_length:
+            return Response(
+                {'detail': f'El header {IDEMPOTENCY_HEADER} admite hasta {max_length} caracteres.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = request_fingerprint(request)
+        now = timezone.now()
+        ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', datetime.timedelta(hours=24))
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is not None and record.expires_at <= now:
+            record.delete()
+            record = None
+
+        if record is None:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user, key=key, fingerprint=fingerprint, expires_at=now + ttl
+                    )
+            except IntegrityError:
+                record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+            else:
+                return _run(record, view_method, self, request, args, kwargs)
+
+        if record is not None and record.status_code is None and _take_over(record, fingerprint, now, ttl):
+            return _run(record, view_method, self, request, args, kwargs)
+        if record is None or record.status_code is None:
+            return Response(
+                {'detail': 'El request original con esta clave todavía se está procesando.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if record.fingerprint != fingerprint:
+            return Response(
+                {'detail': f'La clave {IDEMPOTENCY_HEADER} ya se usó con otro request.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return _replay(record)
+
+    return wrapper
+
+
+class IdempotentCreateMixin:
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+
+def purge_expired_keys(chunk_size=5000):
+    """Borra las claves vencidas en lotes y devuelve cuántas borró."""
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,138 @@
+import csv
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ecommers.background import background_task, run_in_background
+from .models import AdminJob, Order
+from .services.export import COLUMNS, iter_order_rows
+from .services.totals import recompute_order_totals
+from .services.transitions import transition_orders
+
+logger = logging.getLogger(__name__)
+
+JOB_RUNNERS = {}
+
+
+def job_runner(kind):
+    def register(func):
+        JOB_RUNNERS[kind] = func
+        return func
+    return register
+
+
+def _chunks(ids):
+    size = settings.ADMIN_JOB_CHUNK_SIZE
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _advance(job, count):
+    # UPDATE propio fuera de la transacción del lote: el admin ve el avance en vivo.
+    AdminJob.objects.filter(pk=job.pk).update(
+        processed=F('processed') + count, heartbeat_at=timezone.now()
+    )
+
+
+def start_job(kind, object_ids, user=None, **params):
+    """Crea el AdminJob y lo manda a correr cuando se confirma la transacción."""
+    object_ids = list(object_ids)
+    job = AdminJob.objects.create(
+        kind=kind, params=params, object_ids=object_ids, total=len(object_ids),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    transaction.on_commit(lambda: run_in_background(run_job, job.pk))
+    return job
+
+
+@background_task
+def run_job(job_id):
+    # El UPDATE condicional reclama el job: si llega despachado dos veces,
+    # solo una de las corridas lo encuentra pendiente.
+    now = timezone.now()
+    claimed = AdminJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=now, heartbeat_at=now
+    )
+    if not claimed:
+        return
+    job = AdminJob.objects.select_related('created_by').get(pk=job_id)
+    try:
+        result = JOB_RUNNERS[job.kind](job, job.object_ids)
+    except Exception as error:
+        AdminJob.objects.filter(pk=job.pk).update(
+            status='failed', error=repr(error), finished_at=timezone.now()
+        )
+        raise
+    AdminJob.objects.filter(pk=job.pk).update(
+        status='done', result=result, finished_at=timezone.now()
+    )
+
+
+def sweep_stale_jobs():
+    """Cierra los jobs abandonados por un proceso que murió.
+
+    Los que siguen en curso sin latido hace más de ``ADMIN_JOB_STALE_AFTER``
+    segundos se marcan como fallidos (pueden haber hecho parte del trabajo);
+    los que nunca arrancaron se vuelven a despachar. Devuelve
+    ``(fallidos, redespachados)``.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.ADMIN_JOB_STALE_AFTER)
+    failed = AdminJob.objects.filter(status='running', heartbeat_at__lt=cutoff).update(
+        status='failed', error='Abandonado: el proceso que lo corría dejó de avanzar.', finished_at=now
+    )
+    pending = list(
+        AdminJob.objects.filter(status='pending', created_at__lt=cutoff).values_list('pk', flat=True)
+    )
+    for job_id in pending:
+        run_in_background(run_job, job_id)
+    if failed or pending:
+        logger.warning("AdminJobs abandonados: %s fallidos, %s redespachados.", failed, len(pending))
+    return failed, len(pending)
+
+
+@job_runner('transition')
+def _run_transition(job, ids):
+    updated = skipped = 0
+    for chunk in _chunks(ids):
+        chunk_updated, chunk_skipped = transition_orders(chunk, job.params['status'], user=job.created_by)
+        updated += chunk_updated
+        skipped += len(chunk_skipped)
+        _advance(job, len(chunk))
+    return {'updated': updated, 'skipped': skipped}
+
+
+@job_runner('recompute_totals')
+def _run_recompute(job, ids):
+    recomputed = 0
+    for chunk in _chunks(ids):
+        with transaction.atomic():
+            recomputed += recompute_order_totals(Order.all_objects.filter(pk__in=chunk))
+        _advance(job, len(chunk))
+    return {'recomputed': recomputed}
+
+
+def export_path(job):
+    return os.path.join(settings.ADMIN_JOB_EXPORT_DIR, f'orders-{job.pk}.csv')
+
+
+@job_runner('export')
+def _run_export(job, ids):
+    os.makedirs(settings.ADMIN_JOB_EXPORT_DIR, exist_ok=True)
+    path = export_path(job)
+    rows = 0
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.DictWriter(output, fieldnames=COLUMNS)
+        writer.writeheader()
+        for chunk in _chunks(ids):
+            queryset = Order.all_objects.filter(pk__in=chunk).order_by('created_at', 'id')
+            for row in iter_order_rows(queryset):
+                writer.writerow(row)
+                rows += 1
+            _advance(job, len(chunk))
+    return {'file': os.path.basename(path), 'rows': rows}
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from orders.services.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve las órdenes inactivas o terminadas hace más de ORDER_ARCHIVE_AFTER, "
+        "y los items inactivos, a las tablas de archivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--sleep', type=float, default=0.5,
+            help="Segundos de pausa entre lotes.",
+        )
+        parser.add_argument('--limit', type=int, help="Máximo de filas por tabla en esta corrida.")
+
+    def handle(self, *args, **options):
+        orders, items = archive_orders(
+            batch_size=options['batch_size'], sleep=options['sleep'],
+            limit=options['limit'], stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f"{orders} orden(es) y {items} item(s) archivados."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.services.query_plans import check_order_query_plans, order_workload
+
+
+class Command(BaseCommand):
+    help = (
+        "Corre EXPLAIN sobre las consultas principales de la API y el admin de órdenes "
+        "y falla si alguna recorre una tabla completa."
+    )
+
+    def handle(self, *args, **options):
+        workload = order_workload()
+        if not workload:
+            raise CommandError("No hay órdenes para revisar.")
+
+        problems = check_order_query_plans()
+        for name, _ in workload:
+            if name in problems:
+                self.stdout.write(self.style.ERROR(f"{name}: {'; '.join(problems[name])}"))
+            else:
+                self.stdout.write(f"{name}: ok")
+
+        if problems:
+            raise CommandError(f"{len(problems)} consulta(s) con scan completo de tabla.")
+        self.stdout.write(self.style.SUCCESS("Todas las consultas usan índices."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.services.export import EXPORT_FORMATS, export_filters, export_queryset, iter_order_rows
+
+
+class Command(BaseCommand):
+    help = "Exporta las órdenes activas con sus items aplanados, en CSV o NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help="Archivo de salida (por defecto, stdout).")
+        parser.add_argument('--date-from', help="AAAA-MM-DD")
+        parser.add_argument('--date-to', help="AAAA-MM-DD, inclusive")
+        parser.add_argument('--status', help="Estados separados por coma.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            filters = export_filters({
+                'date_from': options['date_from'],
+                'date_to': options['date_to'],
+                'status': options['status'],
+            })
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        render, _ = EXPORT_FORMATS[options['output_format']]
+        rows = iter_order_rows(export_queryset(**filters), chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(render(rows))
+        else:
+            self.stdout.ending = ''
+            for chunk in render(rows):
+                self.stdout.write(chunk)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Borra las claves de idempotencia vencidas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} clave(s) borradas."))
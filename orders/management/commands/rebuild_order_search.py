@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import Order
+from orders.search import order_search
+
+
+class Command(BaseCommand):
+    help = "Vuelve a generar el índice de búsqueda de órdenes (orders.search)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        indexed = order_search.rebuild(
+            Order.all_objects.all(), chunk_size=options['chunk_size'], stdout=self.stdout
+        )
+        self.stdout.write(self.style.SUCCESS(f"{indexed} orden(es) indexadas."))
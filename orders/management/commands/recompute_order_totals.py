@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from orders.models import Order
+from orders.services.totals import recompute_order_totals
+
+
+class Command(BaseCommand):
+    help = "Recalcula total_standard, total_card y total de las órdenes por rangos de id."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--start-id', type=int, default=None)
+        parser.add_argument('--end-id', type=int, default=None)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        bounds = Order._base_manager.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write("No hay órdenes para recalcular.")
+            return
+
+        start = options['start_id'] if options['start_id'] is not None else bounds['first']
+        end = options['end_id'] if options['end_id'] is not None else bounds['last']
+        total = 0
+        for low in range(start, end + 1, chunk_size):
+            high = min(low + chunk_size, end + 1)
+            with transaction.atomic():
+                count = recompute_order_totals(
+                    Order._base_manager.filter(pk__gte=low, pk__lt=high)
+                )
+            total += count
+            self.stdout.write(f"Órdenes {low}-{high - 1}: {count} recalculadas ({total} en total).")
+
+        self.stdout.write(self.style.SUCCESS(f"{total} órdenes recalculadas."))
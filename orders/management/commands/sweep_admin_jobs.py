@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.jobs import sweep_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Marca como fallidos los AdminJob abandonados y redespacha los que nunca arrancaron."
+
+    def handle(self, *args, **options):
+        failed, requeued = sweep_stale_jobs()
+        self.stdout.write(self.style.SUCCESS(f"{failed} job(s) fallidos, {requeued} redespachados."))
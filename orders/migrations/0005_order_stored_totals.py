@@ -0,0 +1,55 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:23
+
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    # Carga inicial; para reparar desvíos después usar recompute_order_totals.
+    Order = apps.get_model('orders', 'Order')
+    OrderDetail = apps.get_model('orders', 'OrderDetail')
+    OrderDetailCard = apps.get_model('orders', 'OrderDetailCard')
+    money = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def items_sum(model, amount):
+        items = (
+            model.objects.filter(order=OuterRef('pk'), is_active=True)
+            .order_by().values('order')
+            .annotate(amount=Sum(amount, output_field=money)).values('amount')
+        )
+        return Coalesce(Subquery(items, output_field=money), Value(0, output_field=money))
+
+    card_price = Case(
+        When(offer=True, then=F('unit_price') - F('discount')),
+        default=F('unit_price'),
+        output_field=money,
+    )
+    Order.objects.update(
+        total_standard=items_sum(OrderDetail, F('quantity') * F('unit_price')),
+        total_card=items_sum(OrderDetailCard, F('quantity') * card_price),
+    )
+    Order.objects.update(
+        total=F('total_standard') + F('total_card') + F('shipping_cost') + F('tax_amount')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_remove_order_iva_condition_delete_ivacondition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_card',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_standard',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_ordernumbersequence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='payment_status',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='orders.paymentstatus'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='order_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='order_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['payment_status', '-created_at', '-id'], name='order_payment_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['shipping_city', '-created_at', '-id'], name='order_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderdetail',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-id'], name='orderdetail_active_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderdetail',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order'], name='orderdetail_active_ord_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderdetailcard',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-id'], name='orderdetailcard_active_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderdetailcard',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order'], name='orderdetailcard_active_ord_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cardinfo',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['payment_method'], name='cardinfo_active_pm_idx'),
+        ),
+    ]
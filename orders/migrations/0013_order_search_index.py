@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Concat
+
+from ecommers.fulltext import SearchIndex
+
+
+def order_document():
+    return Concat(
+        'order_number', Value(' '), 'user__username', Value(' '),
+        'user__email', Value(' '), 'shipping_phone',
+        output_field=models.CharField(),
+    )
+
+
+order_search = SearchIndex('orders_order_search', document=order_document)
+
+
+def create_search_index(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    order_search.create(schema_editor.connection)
+    order_search.rebuild(Order._base_manager.using(schema_editor.connection.alias))
+
+
+def drop_search_index(apps, schema_editor):
+    order_search.drop(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_cardinfo_active_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:49
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+import ecommers.soft_delete
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0014_adminjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinancingPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('installments', models.PositiveSmallIntegerField()),
+                ('interest_rate', models.DecimalField(decimal_places=3, default=0, max_digits=6)),
+                ('surcharge', models.DecimalField(decimal_places=3, default=0, max_digits=6)),
+                ('rounding', models.DecimalField(choices=[(Decimal('0.01'), 'Centavos'), (Decimal('0.10'), 'Diez centavos'), (Decimal('1.00'), 'Pesos')], decimal_places=2, default=Decimal('0.01'), max_digits=4)),
+                ('is_active', models.BooleanField(default=True)),
+                ('payment_method', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='financing_plans', to='orders.paymentmethod')),
+            ],
+            options={
+                'ordering': ['payment_method', 'installments'],
+            },
+            bases=(ecommers.soft_delete.SoftDeleteMixin, models.Model),
+        ),
+        migrations.AddConstraint(
+            model_name='financingplan',
+            constraint=models.UniqueConstraint(fields=('payment_method', 'installments'), name='financing_plan_unique_installments'),
+        ),
+    ]
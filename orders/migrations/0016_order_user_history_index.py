@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0015_financingplan'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', '-created_at', '-id', 'order_number', 'status', 'payment_status', 'total_standard', 'total_card', 'total', 'is_active'], name='order_user_active_created_idx'),
+        ),
+    ]
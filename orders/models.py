@@ -1,56 +1,134 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import ExpressionWrapper, F, Value
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ecommers.soft_delete import SoftDeleteManager, SoftDeleteMixin, SoftDeleteQuerySet
 
 User = get_user_model()
 
 
-class Product(models.Model):
+class Product(SoftDeleteMixin, models.Model):
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     is_active = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
 
-class PaymentMethod(models.Model):
+class PaymentMethod(SoftDeleteMixin, models.Model):
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
 
-class PaymentStatus(models.Model):
+
+class PaymentStatus(SoftDeleteMixin, models.Model):
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
 
-class Persona(models.Model):
+class Persona(SoftDeleteMixin, models.Model):
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
 
-class Company(models.Model):
+
+class Company(SoftDeleteMixin, models.Model):
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
 
-class FiscalCondition(models.Model):
+class FiscalCondition(SoftDeleteMixin, models.Model):
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
 
 
-class CardInfo(models.Model):
+
+class CardInfo(SoftDeleteMixin, models.Model):
     payment_method = models.ForeignKey(PaymentMethod, on_delete=models.CASCADE)
     card_holder = models.CharField(max_length=100)
     card_number = models.CharField(max_length=100)
     expiration = models.DateField()
     is_active = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['payment_method'], name='cardinfo_active_pm_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
     def __str__(self):
         return f"{self.card_holder} - {self.card_number[-4:]}"
 
 
-class Order(models.Model):
+class FinancingPlan(SoftDeleteMixin, models.Model):
+    """Plan de cuotas de un medio de pago (ver orders.services.installments)."""
+
+    ROUNDING_CHOICES = [
+        (Decimal('0.01'), 'Centavos'),
+        (Decimal('0.10'), 'Diez centavos'),
+        (Decimal('1.00'), 'Pesos'),
+    ]
+
+    payment_method = models.ForeignKey(PaymentMethod, on_delete=models.CASCADE, related_name='financing_plans')
+    installments = models.PositiveSmallIntegerField()
+    # Tasa mensual en %, sistema francés (cuota fija). 0 = cuotas sin interés.
+    interest_rate = models.DecimalField(max_digits=6, decimal_places=3, default=0)
+    # Recargo en % sobre el subtotal, antes de financiar.
+    surcharge = models.DecimalField(max_digits=6, decimal_places=3, default=0)
+    # Múltiplo al que se redondea el valor de cada cuota.
+    rounding = models.DecimalField(max_digits=4, decimal_places=2, choices=ROUNDING_CHOICES, default=Decimal('0.01'))
+    is_active = models.BooleanField(default=True)
+
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['payment_method', 'installments']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['payment_method', 'installments'], name='financing_plan_unique_installments',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.payment_method_id}: {self.installments} cuotas"
+
+
+class OrderNumberSequence(models.Model):
+    prefix = models.CharField(max_length=20, unique=True)
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.prefix} ({self.last_value})"
+
+
+class Order(SoftDeleteMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pendiente'),
         ('confirmed', 'Confirmado'),
@@ -65,7 +143,8 @@ class Order(models.Model):
     persona = models.ForeignKey(Persona, on_delete=models.CASCADE)
     order_number = models.CharField(max_length=20, unique=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    payment_status = models.ForeignKey(PaymentStatus, on_delete=models.CASCADE)
+    # Sin índice propio: lo cubre order_payment_status_idx.
+    payment_status = models.ForeignKey(PaymentStatus, on_delete=models.CASCADE, db_index=False)
     estimated_delivery = models.DateField(null=True, blank=True)
     fiscal_condition = models.ForeignKey(FiscalCondition, on_delete=models.CASCADE)
     shipping_address = models.CharField(max_length=255, blank=True)
@@ -75,36 +154,389 @@ class Order(models.Model):
     notes = models.TextField(blank=True)
     shipping_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     tax_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_standard = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_card = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    soft_delete_cascade = ('standard_items', 'card_items')
+
+    # Columnas que mantienen los items (OrderItemTotalsMixin) con deltas.
+    ITEM_TOTAL_FIELDS = ('total_standard', 'total_card')
+    TOTAL_FIELDS = ITEM_TOTAL_FIELDS + ('total',)
+
+    class Meta:
+        # Ver orders.services.query_plans para las consultas que cubre cada índice.
+        indexes = [
+            # API: paginación por cursor de OrderViewSet (solo órdenes activas).
+            models.Index(
+                fields=['-created_at', '-id'], name='order_active_created_idx',
+                condition=models.Q(is_active=True),
+            ),
+            # API: /orders/mine/. Cubre OrderSummarySerializer, así la página
+            # sale del índice sin leer la tabla. is_active va también al final:
+            # SQLite no cuenta la condición del índice parcial para cubrir el
+            # WHERE, y antes de created_at rompería el orden (se compara como
+            # ``"is_active"``, no como igualdad).
+            models.Index(
+                fields=[
+                    'user', '-created_at', '-id', 'order_number', 'status', 'payment_status',
+                    'total_standard', 'total_card', 'total', 'is_active',
+                ],
+                name='order_user_active_created_idx',
+                condition=models.Q(is_active=True),
+            ),
+            # Admin: changelist y sus filtros, ordenados como OrderAdmin.ordering.
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='order_status_idx'),
+            models.Index(fields=['payment_status', '-created_at', '-id'], name='order_payment_status_idx'),
+            models.Index(fields=['shipping_city', '-created_at', '-id'], name='order_city_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.order_number or self.id}"
 
+    def order_number_prefix(self):
+        prefix = getattr(settings, 'ORDER_NUMBER_PREFIX', 'ORD')
+        if getattr(settings, 'ORDER_NUMBER_PER_COMPANY', False):
+            return f"{prefix}{self.company_id}-"
+        return prefix
+
     def save(self, *args, **kwargs):
         if not self.order_number:
-            self.order_number = f"ORD{str(self.id or '').zfill(6)}"
-        self.total = self.get_total()
-        super().save(*args, **kwargs)
+            from .services.numbering import order_numbers
+
+            self.order_number = order_numbers.allocate(self.order_number_prefix())
+        if self._state.adding:
+            self.total = self.get_total()
+            super().save(*args, **kwargs)
+            return
+
+        # En un UPDATE no se pisan los subtotales de items: la instancia en
+        # memoria puede estar desactualizada respecto de los deltas ya aplicados.
+        update_fields = kwargs.pop('update_fields', None)
+        if update_fields is None:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key
+            ]
+        update_fields = set(update_fields) - set(self.ITEM_TOTAL_FIELDS)
+        if not update_fields & {'shipping_cost', 'tax_amount', 'total'}:
+            # Ej. la baja lógica (update_fields=['is_active']): el total no cambia.
+            super().save(*args, update_fields=update_fields, **kwargs)
+            return
+        update_fields.add('total')
+        self.total = ExpressionWrapper(
+            F('total_standard') + F('total_card')
+            + Value(
+                self.shipping_cost + self.tax_amount,
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+        super().save(*args, update_fields=update_fields, **kwargs)
+        # Sin SELECT extra: los totales quedan diferidos y se leen juntos
+        # recién cuando alguien los usa (ver refresh_from_db).
+        for name in self.TOTAL_FIELDS:
+            self.__dict__.pop(name, None)
+
+    def refresh_from_db(self, using=None, fields=None):
+        if fields is not None and set(fields) & set(self.TOTAL_FIELDS):
+            fields = set(fields) | (set(self.TOTAL_FIELDS) & self.get_deferred_fields())
+        super().refresh_from_db(using=using, fields=fields)
 
     def get_total_standard(self):
-        return sum(item.subtotal for item in self.standard_items.filter(is_active=True))
+        return self.total_standard
 
     def get_total_card(self):
-        return sum(item.subtotal for item in self.card_items.filter(is_active=True))
+        return self.total_card
 
     def get_total(self):
-        return self.get_total_standard() + self.get_total_card() + self.shipping_cost + self.tax_amount
+        return self.total_standard + self.total_card + self.shipping_cost + self.tax_amount
+
+
+class OrderStatusHistory(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_history')
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-changed_at']
+
+    def __str__(self):
+        return f"{self.order_id}: {self.from_status} -> {self.to_status}"
 
 
-class OrderDetail(models.Model):
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    # Nulo mientras el request original se está procesando.
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_key_per_user'),
+        ]
+
+    def __str__(self):
+        return self.key
+
+
+class AdminJob(models.Model):
+    """Acción del admin que corre en segundo plano (ver orders.jobs)."""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En curso'),
+        ('done', 'Terminada'),
+        ('failed', 'Falló'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    params = models.JSONField(default=dict, blank=True)
+    object_ids = models.JSONField(default=list, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Lo renueva cada lote: si deja de moverse, el proceso que la corría murió.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def progress(self):
+        if not self.total:
+            return 100 if self.status == 'done' else 0
+        return min(100, self.processed * 100 // self.total)
+
+
+class ArchivedOrder(models.Model):
+    """Orden movida fuera de la tabla caliente (ver orders.services.archive).
+
+    Sin FKs para poder vivir en otra base (``ARCHIVE_DATABASE``); ``data``
+    guarda las columnas de la orden, sus items y su historial de estados.
+    """
+
+    # Misma pk que tenía en Order, así las URLs viejas siguen resolviendo.
+    id = models.BigIntegerField(primary_key=True)
+    order_number = models.CharField(max_length=20, unique=True)
+    user_id = models.IntegerField(db_index=True)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    is_active = models.BooleanField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [models.Index(fields=['-created_at'], name='archivedorder_created_idx')]
+
+    def __str__(self):
+        return f"Archived order #{self.order_number}"
+
+    def to_order(self):
+        """Reconstruye la orden (sin guardar) con sus items precargados, para serializarla."""
+        order = _restore(Order, self.data['order'])
+        for name, model in (('standard_items', OrderDetail), ('card_items', OrderDetailCard)):
+            items = [_restore(model, values) for values in self.data.get(name, []) if values['is_active']]
+            for item in items:
+                item.order = order
+            queryset = model.objects.none()
+            queryset._result_cache = items
+            queryset._prefetch_done = True
+            order._prefetched_objects_cache[name] = queryset
+        return order
+
+
+class ArchivedOrderItem(models.Model):
+    """Item inactivo de una orden que sigue en la tabla caliente."""
+
+    ITEM_TYPES = [('standard', 'OrderDetail'), ('card', 'OrderDetailCard')]
+
+    item_type = models.CharField(max_length=10, choices=ITEM_TYPES)
+    item_id = models.BigIntegerField()
+    order_id = models.BigIntegerField(db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item_type', 'item_id'], name='archived_item_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_type} #{self.item_id} (order {self.order_id})"
+
+
+def _restore(model, values):
+    instance = model(**{
+        field.attname: field.to_python(values.get(field.attname))
+        for field in model._meta.concrete_fields if field.attname in values
+    })
+    instance._state.adding = False
+    instance._prefetched_objects_cache = {}
+    return instance
+
+
+class OrderItemQuerySet(SoftDeleteQuerySet):
+    # Las escrituras masivas no pasan por save()/delete(), así que se
+    # recalculan los totales de las órdenes afectadas con SQL.
+
+    def _affected_order_ids(self):
+        return list(self.order_by().values_list('order_id', flat=True).distinct())
+
+    def update(self, **kwargs):
+        from .services.totals import recompute_order_totals
+
+        with transaction.atomic(using=self.db):
+            order_ids = self._affected_order_ids()
+            if 'order' in kwargs or 'order_id' in kwargs:
+                new_order = kwargs.get('order', kwargs.get('order_id'))
+                order_ids.append(getattr(new_order, 'pk', new_order))
+            rows = super().update(**kwargs)
+            recompute_order_totals(Order.all_objects.filter(pk__in=order_ids))
+        return rows
+
+    # delete() (baja lógica) es un update(); hard_delete() borra las filas.
+    def _mark_inactive(self, cascaded=False):
+        if not cascaded:
+            return super()._mark_inactive()
+        # Baja de la orden entera: un UPDATE simple. Los totales guardados de
+        # la orden quedan como estaban (el archivo conserva el total histórico).
+        field = self._soft_delete_field()
+        return SoftDeleteQuerySet.update(self.filter(**{field: True}), **{field: False})
+
+    def hard_delete(self):
+        from .services.totals import recompute_order_totals
+
+        with transaction.atomic(using=self.db):
+            order_ids = self._affected_order_ids()
+            result = super().hard_delete()
+            recompute_order_totals(Order.all_objects.filter(pk__in=order_ids))
+        return result
+
+    hard_delete.alters_data = True
+    hard_delete.queryset_only = True
+
+
+class OrderItemTotalsMixin:
+    """Aplica a Order el delta de subtotal de cada escritura del item."""
+
+    order_total_field = None
+    tracked_fields = ('order_id', 'is_active', 'quantity', 'unit_price')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if all(name in loaded for name in cls.tracked_fields):
+            instance._stored_values = {name: loaded[name] for name in cls.tracked_fields}
+        return instance
+
+    @classmethod
+    def contribution_from(cls, values):
+        """Aporte del item al subtotal de la orden según ``tracked_fields``."""
+        if not values['is_active'] or values['unit_price'] is None or values['quantity'] is None:
+            return Decimal('0')
+        return Decimal(values['unit_price']) * values['quantity']
+
+    def _current_values(self):
+        return {name: getattr(self, name) for name in self.tracked_fields}
+
+    def _stored_contribution(self):
+        if self._state.adding:
+            return None
+        values = getattr(self, '_stored_values', None)
+        if values is None:
+            values = type(self)._base_manager.filter(pk=self.pk).values(*self.tracked_fields).first()
+            if values is None:
+                return None
+        return values['order_id'], self.contribution_from(values)
+
+    def _apply_total_deltas(self, previous, current):
+        deltas = {}
+        if previous is not None:
+            deltas[previous[0]] = deltas.get(previous[0], 0) - previous[1]
+        if current is not None:
+            deltas[current[0]] = deltas.get(current[0], 0) + current[1]
+
+        field = self.order_total_field
+        cached_order = self._state.fields_cache.get('order')
+        for order_id, delta in deltas.items():
+            if not delta:
+                continue
+            Order._base_manager.filter(pk=order_id).update(**{
+                field: F(field) + delta,
+                'total': F('total') + delta,
+            })
+            if cached_order is not None and cached_order.pk == order_id:
+                # Los diferidos se leerán ya con el delta aplicado.
+                deferred = cached_order.get_deferred_fields()
+                for name in (field, 'total'):
+                    if name not in deferred:
+                        setattr(cached_order, name, getattr(cached_order, name) + delta)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            previous = self._stored_contribution()
+            super().save(*args, **kwargs)
+            current_values = self._current_values()
+            self._apply_total_deltas(
+                previous, (self.order_id, self.contribution_from(current_values))
+            )
+            self._stored_values = current_values
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            previous = self._stored_contribution()
+            result = super().delete(*args, **kwargs)
+            self._apply_total_deltas(previous, None)
+            self._stored_values = None
+        return result
+
+
+class OrderDetail(SoftDeleteMixin, OrderItemTotalsMixin, models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="standard_items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     is_active = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager.from_queryset(OrderItemQuerySet)()
+    all_objects = OrderItemQuerySet.as_manager()
+
+    order_total_field = 'total_standard'
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-id'], name='orderdetail_active_id_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=['order'], name='orderdetail_active_ord_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
     @property
     def subtotal(self):
         if self.unit_price is None or self.quantity is None:
@@ -112,7 +544,7 @@ class OrderDetail(models.Model):
         return self.unit_price * self.quantity
 
 
-class OrderDetailCard(models.Model):
+class OrderDetailCard(SoftDeleteMixin, OrderItemTotalsMixin, models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="card_items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     card_info = models.ForeignKey(CardInfo, on_delete=models.CASCADE)
@@ -124,6 +556,33 @@ class OrderDetailCard(models.Model):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     is_active = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager.from_queryset(OrderItemQuerySet)()
+    all_objects = OrderItemQuerySet.as_manager()
+
+    order_total_field = 'total_card'
+    tracked_fields = OrderItemTotalsMixin.tracked_fields + ('offer', 'discount')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-id'], name='orderdetailcard_active_id_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=['order'], name='orderdetailcard_active_ord_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
+    @classmethod
+    def contribution_from(cls, values):
+        if not values['is_active'] or values['unit_price'] is None or values['quantity'] is None:
+            return Decimal('0')
+        price = Decimal(values['unit_price'])
+        if values['offer']:
+            price -= Decimal(values['discount'] or 0)
+        return price * values['quantity']
+
     @property
     def unit_price_with_offer(self):
         if self.unit_price is None:
@@ -142,4 +601,4 @@ class OrderDetailCard(models.Model):
         sub = self.subtotal
         if not self.installments:
             return sub
-        return sub / self.installments
\ No newline at end of file
+        return sub / self.installments
@@ -0,0 +1,48 @@
+import copy
+import threading
+
+from ecommers.versions import table_version
+from .models import PaymentMethod, PaymentStatus, Persona, Company, FiscalCondition
+
+REFERENCE_MODELS = (PaymentMethod, PaymentStatus, Persona, Company, FiscalCondition)
+
+
+class ReferenceDataCache:
+    """Cache en memoria de las tablas de referencia chicas (filas activas por pk).
+
+    Cada proceso guarda su copia junto con la versión de la tabla
+    (``ecommers.versions``); las señales de ``orders.signals`` cambian la
+    versión en cada save/delete y la próxima lectura recarga la tabla entera.
+    ``get`` y ``all`` devuelven copias: las instancias guardadas se comparten
+    entre hilos y no deben terminar asignadas (y modificadas) como FK.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _rows(self, model):
+        version = table_version(model)
+        cached = self._tables.get(model)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            rows = {obj.pk: obj for obj in model._base_manager.filter(is_active=True)}
+            self._tables[model] = (version, rows)
+        return rows
+
+    def get(self, model, pk):
+        obj = self._rows(model).get(pk)
+        return copy.copy(obj) if obj is not None else None
+
+    def ids(self, model):
+        return set(self._rows(model))
+
+    def all(self, model):
+        return [copy.copy(obj) for obj in self._rows(model).values()]
+
+    def clear(self):
+        self._tables.clear()
+
+
+reference_data = ReferenceDataCache()
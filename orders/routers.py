@@ -0,0 +1,28 @@
+from django.conf import settings
+
+
+class ArchiveRouter:
+    """Manda las tablas de archivo a ``settings.ARCHIVE_DATABASE``."""
+
+    archive_models = {'archivedorder', 'archivedorderitem'}
+
+    def _is_archive(self, app_label, model_name):
+        return app_label == 'orders' and model_name in self.archive_models
+
+    def db_for_read(self, model, **hints):
+        if self._is_archive(model._meta.app_label, model._meta.model_name):
+            return settings.ARCHIVE_DATABASE
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        archive_db = settings.ARCHIVE_DATABASE
+        if model_name is not None and self._is_archive(app_label, model_name):
+            return db == archive_db
+        if archive_db != 'default' and db == archive_db:
+            return False
+        return None
@@ -0,0 +1,19 @@
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat
+
+from ecommers.fulltext import SearchIndex
+
+# Campos que antes buscaba OrderAdmin con icontains.
+ORDER_SEARCH_FIELDS = ('order_number', 'shipping_phone', 'user')
+USER_SEARCH_FIELDS = ('username', 'email')
+
+
+def order_document():
+    return Concat(
+        'order_number', Value(' '), 'user__username', Value(' '),
+        'user__email', Value(' '), 'shipping_phone',
+        output_field=CharField(),
+    )
+
+
+order_search = SearchIndex('orders_order_search', document=order_document)
@@ -1,8 +1,27 @@
 from rest_framework import serializers
+from ecommers.serializers import SparseFieldsetMixin
 from .models import (
     Product, PaymentMethod, PaymentStatus, Persona, Company,
-    FiscalCondition, CardInfo, Order, OrderDetail, OrderDetailCard
+    FiscalCondition, CardInfo, FinancingPlan, Order, OrderDetail, OrderDetailCard, OrderStatusHistory
 )
+from .reference_data import reference_data
+from .services.transitions import can_transition
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField que valida contra ``reference_data`` sin consultar la base."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = reference_data.get(self.get_queryset().model, pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -44,12 +63,14 @@ class FiscalConditionSerializer(serializers.ModelSerializer):
 
 
 class CardInfoSerializer(serializers.ModelSerializer):
+    payment_method = CachedPrimaryKeyRelatedField(queryset=PaymentMethod.objects.all())
+
     class Meta:
         model = CardInfo
         fields = ['id', 'payment_method', 'card_holder', 'card_number', 'expiration', 'is_active']
 
 
-class OrderDetailSerializer(serializers.ModelSerializer):
+class OrderDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     subtotal = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
@@ -60,7 +81,7 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         return obj.subtotal
 
 
-class OrderDetailCardSerializer(serializers.ModelSerializer):
+class OrderDetailCardSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     unit_price_with_offer = serializers.SerializerMethodField(read_only=True)
     subtotal = serializers.SerializerMethodField(read_only=True)
     total_installments = serializers.SerializerMethodField(read_only=True)
@@ -83,12 +104,19 @@ class OrderDetailCardSerializer(serializers.ModelSerializer):
         return obj.total_installments
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    company = CachedPrimaryKeyRelatedField(queryset=Company.objects.all())
+    persona = CachedPrimaryKeyRelatedField(queryset=Persona.objects.all())
+    payment_status = CachedPrimaryKeyRelatedField(queryset=PaymentStatus.objects.all())
+    fiscal_condition = CachedPrimaryKeyRelatedField(queryset=FiscalCondition.objects.all())
     standard_items = OrderDetailSerializer(many=True, read_only=True)
     card_items = OrderDetailCardSerializer(many=True, read_only=True)
-    total_standard = serializers.SerializerMethodField(read_only=True)
-    total_card = serializers.SerializerMethodField(read_only=True)
-    total_amount = serializers.SerializerMethodField(read_only=True)
+    total_amount = serializers.DecimalField(
+        source='total', max_digits=10, decimal_places=2, read_only=True
+    )
+
+    expandable_fields = ('standard_items', 'card_items')
+    expand_aliases = {'items': ('standard_items', 'card_items')}
 
     class Meta:
         model = Order
@@ -101,12 +129,103 @@ class OrderSerializer(serializers.ModelSerializer):
             'total_standard', 'total_card', 'total_amount',
             'created_at', 'is_active', 'standard_items', 'card_items'
         ]
+        read_only_fields = ['total', 'total_standard', 'total_card']
+
+    def validate_status(self, value):
+        if self.instance is not None and value != self.instance.status:
+            if not can_transition(self.instance.status, value):
+                raise serializers.ValidationError(
+                    f'No se puede pasar de "{self.instance.status}" a "{value}".'
+                )
+        return value
+
+    def update(self, instance, validated_data):
+        previous_status = instance.status
+        instance = super().update(instance, validated_data)
+        if instance.status != previous_status:
+            request = self.context.get('request')
+            user = request.user if request and request.user.is_authenticated else None
+            OrderStatusHistory.objects.create(
+                order=instance, from_status=previous_status, to_status=instance.status, changed_by=user
+            )
+        return instance
+
+
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """Resumen para el historial del cliente: solo columnas de la orden, con los totales guardados."""
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_number', 'status', 'payment_status',
+            'total_standard', 'total_card', 'total', 'created_at',
+        ]
+        read_only_fields = fields
+
+
+class OrderTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=10000)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+
+# -------- PLANES DE CUOTAS -------- #
+
+class FinancingPlanSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FinancingPlan
+        fields = ['id', 'payment_method', 'installments', 'interest_rate', 'surcharge', 'rounding', 'is_active']
+
+
+class BasketItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class InstallmentQuoteSerializer(serializers.Serializer):
+    items = BasketItemSerializer(many=True, allow_empty=False, max_length=1000)
+    payment_method = CachedPrimaryKeyRelatedField(queryset=PaymentMethod.objects.all(), required=False)
+
+
+# -------- CARGA MASIVA -------- #
+# Las FK se reciben como enteros y se validan juntas para todo el lote en
+# orders.services.bulk, en lugar de una consulta por campo y por fila.
+
+class BulkOrderDetailSerializer(serializers.ModelSerializer):
+    product = serializers.IntegerField()
+
+    class Meta:
+        model = OrderDetail
+        fields = ['product', 'quantity', 'unit_price', 'is_active']
+
+
+class BulkOrderDetailCardSerializer(serializers.ModelSerializer):
+    product = serializers.IntegerField()
+    card_info = serializers.IntegerField()
+
+    class Meta:
+        model = OrderDetailCard
+        fields = [
+            'product', 'card_info', 'cuotas', 'quantity', 'installments',
+            'unit_price', 'offer', 'discount', 'is_active'
+        ]
 
-    def get_total_standard(self, obj):
-        return obj.get_total_standard()
 
-    def get_total_card(self, obj):
-        return obj.get_total_card()
+class BulkOrderSerializer(serializers.ModelSerializer):
+    user = serializers.IntegerField(required=False)
+    company = serializers.IntegerField()
+    persona = serializers.IntegerField()
+    payment_status = serializers.IntegerField()
+    fiscal_condition = serializers.IntegerField()
+    standard_items = BulkOrderDetailSerializer(many=True, required=False)
+    card_items = BulkOrderDetailCardSerializer(many=True, required=False)
 
-    def get_total_amount(self, obj):
-        return obj.get_total()
+    class Meta:
+        model = Order
+        fields = [
+            'order_number', 'user', 'company', 'persona', 'status',
+            'payment_status', 'estimated_delivery', 'fiscal_condition',
+            'shipping_address', 'shipping_city',
+            'shipping_postal_code', 'shipping_phone', 'notes',
+            'shipping_cost', 'tax_amount', 'standard_items', 'card_items'
+        ]
+        extra_kwargs = {'order_number': {'validators': [], 'required': False}}
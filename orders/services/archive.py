@@ -0,0 +1,141 @@
+import datetime
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from orders.models import (
+    ArchivedOrder, ArchivedOrderItem, Order, OrderDetail, OrderDetailCard, OrderStatusHistory
+)
+
+ITEM_MODELS = (
+    ('standard_items', 'standard', OrderDetail),
+    ('card_items', 'card', OrderDetailCard),
+)
+
+
+def _json_value(value):
+    # isoformat explícito: DjangoJSONEncoder recorta los microsegundos.
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _row(instance):
+    return {
+        field.attname: _json_value(field.value_from_object(instance))
+        for field in instance._meta.concrete_fields
+    }
+
+
+def archivable_orders(now=None):
+    """Órdenes inactivas, o terminadas hace más de ``ORDER_ARCHIVE_AFTER``."""
+    cutoff = (now or timezone.now()) - settings.ORDER_ARCHIVE_AFTER
+    return Order._base_manager.filter(
+        Q(is_active=False)
+        | Q(created_at__lt=cutoff, status__in=settings.ORDER_ARCHIVE_STATUSES)
+    )
+
+
+def _archive_order_batch(ids):
+    archive_db = router.db_for_write(ArchivedOrder)
+    with transaction.atomic():
+        # Se vuelve a filtrar con el lock tomado: la orden pudo reactivarse
+        # desde que se eligió el lote.
+        orders = list(
+            archivable_orders().select_for_update().filter(pk__in=ids)
+            .prefetch_related(
+                # Con los items dados de baja incluidos.
+                *(Prefetch(name, queryset=model.all_objects.all()) for name, _, model in ITEM_MODELS),
+                'status_history',
+            )
+        )
+        if not orders:
+            return 0
+        archived = []
+        for order in orders:
+            data = {'order': _row(order)}
+            for name, _, _ in ITEM_MODELS:
+                data[name] = [_row(item) for item in getattr(order, name).all()]
+            data['status_history'] = [_row(entry) for entry in order.status_history.all()]
+            archived.append(ArchivedOrder(
+                id=order.pk, order_number=order.order_number, user_id=order.user_id,
+                status=order.status, is_active=order.is_active, created_at=order.created_at,
+                data=data,
+            ))
+        # Primero se escribe el archivo: si se corta entre las dos bases, la
+        # próxima corrida vuelve a tomar las órdenes y el insert se ignora.
+        with transaction.atomic(using=archive_db):
+            ArchivedOrder.objects.bulk_create(archived, ignore_conflicts=True)
+        pks = [order.pk for order in orders]
+        for _, _, model in ITEM_MODELS:
+            model._base_manager.filter(order_id__in=pks).delete()
+        OrderStatusHistory.objects.filter(order_id__in=pks).delete()
+        Order._base_manager.filter(pk__in=pks).delete()
+    return len(pks)
+
+
+def _archive_item_batch(model, item_type, ids):
+    archive_db = router.db_for_write(ArchivedOrderItem)
+    with transaction.atomic():
+        items = list(model._base_manager.select_for_update().filter(pk__in=ids, is_active=False))
+        if not items:
+            return 0
+        with transaction.atomic(using=archive_db):
+            ArchivedOrderItem.objects.bulk_create([
+                ArchivedOrderItem(item_type=item_type, item_id=item.pk, order_id=item.order_id, data=_row(item))
+                for item in items
+            ], ignore_conflicts=True)
+        # Los items inactivos no suman al total de la orden: se borran sin recalcular.
+        model._base_manager.filter(pk__in=[item.pk for item in items]).delete()
+    return len(items)
+
+
+def _batches(queryset, batch_size, sleep, limit):
+    """Ids de ``queryset`` en lotes, durmiendo ``sleep`` segundos entre uno y otro."""
+    done = 0
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        done += len(ids)
+        if sleep:
+            time.sleep(sleep)
+
+
+def archive_orders(batch_size=500, sleep=0, limit=None, stdout=None):
+    """Mueve órdenes e items inactivos a las tablas de archivo.
+
+    Trabaja en lotes chicos con una transacción por lote y ``sleep`` entre
+    lotes, para no bloquear la base mientras corre. Devuelve
+    ``(órdenes, items)`` archivados.
+    """
+    orders = 0
+    for ids in _batches(archivable_orders(), batch_size, sleep, limit):
+        moved = _archive_order_batch(ids)
+        if not moved:
+            break
+        orders += moved
+        if stdout is not None:
+            stdout.write(f"{orders} órdenes archivadas.")
+
+    items = 0
+    for _, item_type, model in ITEM_MODELS:
+        for ids in _batches(model._base_manager.filter(is_active=False), batch_size, sleep, limit):
+            moved = _archive_item_batch(model, item_type, ids)
+            if not moved:
+                break
+            items += moved
+    return orders, items
+
+
+def find_archived_order(pk=None, order_number=None):
+    lookup = {'pk': pk} if pk is not None else {'order_number': order_number}
+    return ArchivedOrder.objects.filter(**lookup).first()
@@ -0,0 +1,176 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from orders.models import (
+    Product, PaymentStatus, Persona, Company, FiscalCondition, CardInfo,
+    Order, OrderDetail, OrderDetailCard
+)
+from orders.reference_data import REFERENCE_MODELS, reference_data
+from orders.search import order_search
+from orders.serializers import BulkOrderSerializer
+from orders.services.numbering import order_numbers
+
+User = get_user_model()
+
+ORDER_REFERENCES = {
+    'user': User,
+    'company': Company,
+    'persona': Persona,
+    'payment_status': PaymentStatus,
+    'fiscal_condition': FiscalCondition,
+}
+
+ITEM_REFERENCES = {
+    'standard_items': {'product': Product},
+    'card_items': {'product': Product, 'card_info': CardInfo},
+}
+
+ITEM_MODELS = {
+    'standard_items': OrderDetail,
+    'card_items': OrderDetailCard,
+}
+
+
+def _referenced_ids(orders):
+    ids = defaultdict(set)
+    for data in orders.values():
+        for field, model in ORDER_REFERENCES.items():
+            ids[model].add(data[field])
+        for items_field, references in ITEM_REFERENCES.items():
+            for item in data.get(items_field, []):
+                for field, model in references.items():
+                    ids[model].add(item[field])
+    return ids
+
+
+def _existing_ids(ids_by_model):
+    # Las tablas de referencia salen de la cache en memoria; el resto, con
+    # una sola consulta por tabla para todo el lote.
+    existing = {}
+    for model, ids in ids_by_model.items():
+        if model in REFERENCE_MODELS:
+            existing[model] = reference_data.ids(model) & ids
+        else:
+            existing[model] = set(
+                model._base_manager.filter(pk__in=ids, is_active=True).values_list('pk', flat=True)
+            )
+    return existing
+
+
+def _reference_errors(data, existing):
+    errors = {}
+    for field, model in ORDER_REFERENCES.items():
+        if data[field] not in existing[model]:
+            errors[field] = [f'Invalid pk "{data[field]}" - object does not exist.']
+    for items_field, references in ITEM_REFERENCES.items():
+        item_errors = {}
+        for position, item in enumerate(data.get(items_field, [])):
+            missing = {
+                field: [f'Invalid pk "{item[field]}" - object does not exist.']
+                for field, model in references.items()
+                if item[field] not in existing[model]
+            }
+            if missing:
+                item_errors[position] = missing
+        if item_errors:
+            errors[items_field] = item_errors
+    return errors
+
+
+def _duplicated_numbers(orders):
+    numbers = defaultdict(list)
+    for index, data in orders.items():
+        if data.get('order_number'):
+            numbers[data['order_number']].append(index)
+    taken = set(
+        Order._base_manager.filter(order_number__in=numbers).values_list('order_number', flat=True)
+    )
+    duplicated = {}
+    for number, indexes in numbers.items():
+        for index in indexes if number in taken else indexes[1:]:
+            duplicated[index] = number
+    return duplicated
+
+
+def _build_order(data):
+    references = {f'{field}_id': data.pop(field) for field in ORDER_REFERENCES}
+    rows_by_field = {items_field: data.pop(items_field, []) for items_field in ITEM_MODELS}
+    order = Order(**data, **references)
+    items = []
+    for items_field, rows in rows_by_field.items():
+        model = ITEM_MODELS[items_field]
+        for row in rows:
+            row = dict(row)
+            for field in ITEM_REFERENCES[items_field]:
+                row[f'{field}_id'] = row.pop(field)
+            item = model(order=order, **row)
+            total_field = model.order_total_field
+            setattr(order, total_field, getattr(order, total_field)
+                    + model.contribution_from(item._current_values()))
+            items.append(item)
+    order.total = order.get_total()
+    return order, items
+
+
+def ingest_orders(payload, user):
+    """Valida y crea un lote de órdenes con sus items.
+
+    Devuelve ``(created, errors)``: las órdenes válidas se insertan con
+    ``bulk_create`` en una sola transacción y las inválidas se reportan por
+    índice sin afectar al resto del lote.
+    """
+    errors = {}
+    valid = {}
+    for index, raw in enumerate(payload):
+        serializer = BulkOrderSerializer(data=raw)
+        if serializer.is_valid():
+            data = dict(serializer.validated_data)
+            data.setdefault('user', user.pk)
+            valid[index] = data
+        else:
+            errors[index] = serializer.errors
+
+    existing = _existing_ids(_referenced_ids(valid))
+    for index, number in _duplicated_numbers(valid).items():
+        errors[index] = {'order_number': [f'Order with order_number "{number}" already exists.']}
+    for index, data in valid.items():
+        if index in errors:
+            continue
+        reference_errors = _reference_errors(data, existing)
+        if reference_errors:
+            errors[index] = reference_errors
+
+    orders = {}
+    items_by_model = defaultdict(list)
+    for index, data in valid.items():
+        if index in errors:
+            continue
+        order, items = _build_order(data)
+        orders[index] = order
+        for item in items:
+            items_by_model[type(item)].append(item)
+
+    numbers_needed = defaultdict(list)
+    for order in orders.values():
+        if not order.order_number:
+            numbers_needed[order.order_number_prefix()].append(order)
+    for prefix, pending in numbers_needed.items():
+        for order, number in zip(pending, order_numbers.allocate_many(prefix, len(pending))):
+            order.order_number = number
+
+    with transaction.atomic():
+        Order.objects.bulk_create(orders.values(), batch_size=500)
+        for model, items in items_by_model.items():
+            model.objects.bulk_create(items, batch_size=1000)
+        # bulk_create no dispara post_save: se indexan con una sola consulta.
+        order_search.index(Order._base_manager.filter(pk__in=[order.pk for order in orders.values()]))
+
+    created = [
+        {'index': index, 'id': order.pk, 'order_number': order.order_number}
+        for index, order in orders.items()
+    ]
+    return created, [
+        {'index': index, 'errors': errors[index]} for index in sorted(errors)
+    ]
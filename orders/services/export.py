@@ -0,0 +1,136 @@
+import csv
+import datetime
+import json
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from orders.models import Order, OrderDetailCard
+
+ORDER_COLUMNS = [
+    'order_id', 'order_number', 'created_at', 'status', 'user_id', 'company_id',
+    'persona_id', 'payment_status_id', 'fiscal_condition_id', 'shipping_city',
+    'shipping_cost', 'tax_amount', 'total_standard', 'total_card', 'total',
+]
+
+ITEM_COLUMNS = [
+    'item_type', 'item_id', 'product_id', 'card_info_id', 'quantity', 'unit_price',
+    'offer', 'discount', 'cuotas', 'installments', 'subtotal',
+]
+
+COLUMNS = ORDER_COLUMNS + ITEM_COLUMNS
+
+
+def _start_of_day(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def export_queryset(date_from=None, date_to=None, statuses=None):
+    """Órdenes activas a exportar; ``date_to`` incluye el día completo."""
+    queryset = Order.objects.all()
+    if date_from:
+        queryset = queryset.filter(created_at__gte=_start_of_day(date_from))
+    if date_to:
+        queryset = queryset.filter(created_at__lt=_start_of_day(date_to + datetime.timedelta(days=1)))
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset.order_by('created_at', 'id')
+
+
+def _order_values(order):
+    return {
+        'order_id': order.pk,
+        'order_number': order.order_number,
+        'created_at': order.created_at.isoformat(),
+        'status': order.status,
+        'user_id': order.user_id,
+        'company_id': order.company_id,
+        'persona_id': order.persona_id,
+        'payment_status_id': order.payment_status_id,
+        'fiscal_condition_id': order.fiscal_condition_id,
+        'shipping_city': order.shipping_city,
+        'shipping_cost': str(order.shipping_cost),
+        'tax_amount': str(order.tax_amount),
+        'total_standard': str(order.total_standard),
+        'total_card': str(order.total_card),
+        'total': str(order.total),
+    }
+
+
+def _item_values(item):
+    card = isinstance(item, OrderDetailCard)
+    return {
+        'item_type': 'card' if card else 'standard',
+        'item_id': item.pk,
+        'product_id': item.product_id,
+        'card_info_id': item.card_info_id if card else None,
+        'quantity': item.quantity,
+        'unit_price': str(item.unit_price),
+        'offer': item.offer if card else None,
+        'discount': str(item.discount) if card else None,
+        'cuotas': item.cuotas if card else None,
+        'installments': item.installments if card else None,
+        'subtotal': str(item.subtotal),
+    }
+
+
+def iter_order_rows(queryset, chunk_size=2000):
+    """Una fila por item (con los datos de su orden); las órdenes sin items salen en una fila.
+
+    Lee las órdenes en bloques de ``chunk_size`` con ``iterator()`` y precarga
+    los items de cada bloque, así la memoria no crece con el tamaño del export.
+    """
+    queryset = queryset.prefetch_related('standard_items', 'card_items')
+    empty_item = dict.fromkeys(ITEM_COLUMNS)
+    for order in queryset.iterator(chunk_size=chunk_size):
+        order_values = _order_values(order)
+        items = list(order.standard_items.all()) + list(order.card_items.all())
+        if not items:
+            yield {**order_values, **empty_item}
+        for item in items:
+            yield {**order_values, **_item_values(item)}
+
+
+class _Echo:
+    """Buffer que devuelve lo escrito, para usar csv.writer en un generador."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.DictWriter(_Echo(), fieldnames=COLUMNS)
+    yield writer.writerow(dict(zip(COLUMNS, COLUMNS)))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def export_filters(params):
+    """Lee date_from, date_to y status (separados por coma) de un dict de parámetros."""
+    filters = {}
+    for name in ('date_from', 'date_to'):
+        value = params.get(name)
+        if value:
+            date = parse_date(value)
+            if date is None:
+                raise ValueError(f"{name}: fecha inválida, usar AAAA-MM-DD.")
+            filters[name] = date
+    statuses = [status for status in (params.get('status') or '').split(',') if status]
+    valid = {choice for choice, _ in Order.STATUS_CHOICES}
+    invalid = [status for status in statuses if status not in valid]
+    if invalid:
+        raise ValueError(f"status: valores inválidos {', '.join(invalid)}.")
+    if statuses:
+        filters['statuses'] = statuses
+    return filters
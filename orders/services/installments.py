@@ -0,0 +1,114 @@
+import threading
+from collections import namedtuple
+from decimal import ROUND_DOWN, ROUND_HALF_UP, Decimal
+
+from ecommers.versions import table_version
+from orders.models import FinancingPlan, PaymentMethod, Product
+from orders.reference_data import reference_data
+
+HUNDRED = Decimal('100')
+CENT = Decimal('0.01')
+ONE = Decimal('1')
+
+# Términos de un plan con el factor ya calculado: cuota = subtotal * factor.
+PlanTerms = namedtuple('PlanTerms', [
+    'plan_id', 'payment_method_id', 'installments', 'interest_rate', 'surcharge', 'rounding', 'factor',
+])
+
+
+def installment_factor(installments, interest_rate=0, surcharge=0):
+    """Factor por cuota: recargo sobre el subtotal y sistema francés con tasa mensual en %.
+
+    Con tasa 0 queda ``(1 + recargo) / n`` (cuotas sin interés).
+    """
+    n = int(installments)
+    rate = Decimal(interest_rate) / HUNDRED
+    factor = 1 + Decimal(surcharge) / HUNDRED
+    if not rate:
+        return factor / n
+    return factor * rate / (1 - (1 + rate) ** -n)
+
+
+class FinancingTables:
+    """Tablas de financiación por medio de pago, con los factores precalculados.
+
+    Igual que ``ReferenceDataCache``: una copia por proceso que se recarga
+    cuando cambia la versión de ``FinancingPlan`` (ver ``orders.signals``).
+    """
+
+    def __init__(self):
+        self._cached = None
+        self._lock = threading.Lock()
+
+    def _tables(self):
+        version = table_version(FinancingPlan)
+        cached = self._cached
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            tables = {}
+            for plan in FinancingPlan._base_manager.filter(is_active=True).order_by('payment_method', 'installments'):
+                tables.setdefault(plan.payment_method_id, []).append(PlanTerms(
+                    plan.pk, plan.payment_method_id, plan.installments, plan.interest_rate,
+                    plan.surcharge, plan.rounding,
+                    installment_factor(plan.installments, plan.interest_rate, plan.surcharge),
+                ))
+            self._cached = (version, tables)
+        return tables
+
+    def plans(self, payment_method_id=None):
+        """Planes vigentes de un medio de pago (o de todos), solo de medios activos."""
+        tables = self._tables()
+        methods = [payment_method_id] if payment_method_id is not None else sorted(tables)
+        active = reference_data.ids(PaymentMethod)
+        return [terms for pk in methods if pk in active for terms in tables.get(pk, ())]
+
+    def clear(self):
+        self._cached = None
+
+
+financing_tables = FinancingTables()
+
+
+def basket_subtotal(items):
+    """Suma ``precio * cantidad`` de ``[{'product': pk, 'quantity': n}]`` con una sola consulta.
+
+    Devuelve ``(subtotal, pks_inexistentes)``.
+    """
+    quantities = {}
+    for item in items:
+        quantities[item['product']] = quantities.get(item['product'], 0) + item['quantity']
+    prices = Product.objects.in_bulk(list(quantities))
+    missing = sorted(pk for pk in quantities if pk not in prices)
+    subtotal = sum((prices[pk].price * quantity for pk, quantity in quantities.items() if pk in prices), Decimal('0'))
+    return subtotal, missing
+
+
+def quote_plans(subtotal, payment_method_id=None):
+    """Todas las opciones de cuotas para ``subtotal`` en una pasada sobre la tabla."""
+    subtotal = Decimal(subtotal)
+    quotes = []
+    for terms in financing_tables.plans(payment_method_id):
+        total = (subtotal * terms.factor * terms.installments).quantize(CENT, rounding=ROUND_HALF_UP)
+        # Las cuotas van al múltiplo de ``rounding`` (0.10, 1.00, ...) hacia
+        # abajo y la última completa el total: ni se cobra de más ni de menos.
+        # Con una sola cuota, o si redondear deja cuotas en cero, va al centavo.
+        amount = (total / terms.installments).quantize(CENT, rounding=ROUND_DOWN)
+        if terms.installments > 1:
+            rounded = (amount / terms.rounding).quantize(ONE, rounding=ROUND_DOWN) * terms.rounding
+            if rounded > 0:
+                amount = rounded
+        last_amount = total - amount * (terms.installments - 1)
+        quotes.append({
+            'plan': terms.plan_id,
+            'payment_method': terms.payment_method_id,
+            'payment_method_name': reference_data.get(PaymentMethod, terms.payment_method_id).name,
+            'installments': terms.installments,
+            'interest_rate': terms.interest_rate,
+            'surcharge': terms.surcharge,
+            'installment_amount': amount.quantize(CENT),
+            'last_installment_amount': last_amount.quantize(CENT),
+            'total': total.quantize(CENT),
+            'financing_cost': (total - subtotal).quantize(CENT),
+        })
+    return quotes
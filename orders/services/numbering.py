@@ -0,0 +1,148 @@
+import threading
+import weakref
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models.constants import OnConflict
+
+from orders.models import OrderNumberSequence
+
+
+class _Block:
+
+    def __init__(self, start, end):
+        self.next_value = start
+        self.end = end
+        self.committed = True
+        self._pending = None
+
+    def track_commit(self, using):
+        """Reservado dentro de la transacción de quien llama: vale si esa transacción confirma.
+
+        Si vuelve atrás (ella o el savepoint de la reserva), Django descarta el
+        callback y la referencia débil queda vacía.
+        """
+        self.committed = False
+
+        def mark_committed():
+            self.committed = True
+
+        self._pending = weakref.ref(mark_committed)
+        transaction.on_commit(mark_committed, using=using)
+
+    @property
+    def exhausted(self):
+        return self.next_value > self.end
+
+    def rolled_back(self):
+        # Ya no está reservado y otro proceso puede tomar los mismos números.
+        return not self.committed and self._pending() is None
+
+    def take(self, count):
+        last = min(self.next_value + count - 1, self.end)
+        values = list(range(self.next_value, last + 1))
+        self.next_value = last + 1
+        return values
+
+
+class OrderNumberAllocator:
+    """Entrega números de orden desde bloques reservados en memoria.
+
+    Cada hilo reserva ``block_size`` números de una vez bloqueando solo la fila
+    de su prefijo en ``OrderNumberSequence``; los números de un bloque que no
+    se llegan a usar se pierden (la numeración admite huecos).
+    """
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size or getattr(settings, 'ORDER_NUMBER_BLOCK_SIZE', 50)
+        self._local = threading.local()
+
+    @property
+    def _blocks(self):
+        if not hasattr(self._local, 'blocks'):
+            self._local.blocks = {}
+        return self._local.blocks
+
+    def format(self, prefix, value):
+        width = getattr(settings, 'ORDER_NUMBER_WIDTH', 6)
+        return f"{prefix}{str(value).zfill(width)}"
+
+    def allocate(self, prefix):
+        return self.allocate_many(prefix, 1)[0]
+
+    def allocate_many(self, prefix, count):
+        values = []
+        while len(values) < count:
+            block = self._blocks.get(prefix)
+            if block is None or block.exhausted or block.rolled_back():
+                block = self._reserve(prefix, max(self.block_size, count - len(values)))
+                self._blocks[prefix] = block
+            values.extend(block.take(count - len(values)))
+        return [self.format(prefix, value) for value in values]
+
+    def reset(self):
+        self._blocks.clear()
+
+    def _reserve(self, prefix, size):
+        using = router.db_for_write(OrderNumberSequence)
+        connection = connections[using]
+        if connection.in_atomic_block and connection.features.has_select_for_update:
+            # Dentro del checkout, la fila quedaría bloqueada hasta su commit y
+            # todos los checkouts esperarían en fila: se reserva aparte.
+            start = _reserve_on_own_connection(using, prefix, size)
+            return _Block(start, start + size - 1)
+
+        # Sin locks de fila (SQLite) la transacción de quien llama ya tiene el
+        # lock de escritura de toda la base: reservar adentro no agrega espera.
+        with transaction.atomic(using=using):
+            sequence, _ = (
+                OrderNumberSequence.objects.using(using)
+                .select_for_update()
+                .get_or_create(prefix=prefix)
+            )
+            start = sequence.last_value + 1
+            sequence.last_value += size
+            sequence.save(update_fields=['last_value'])
+
+        block = _Block(start, start + size - 1)
+        block.track_commit(using)
+        return block
+
+
+def _reserve_on_own_connection(using, prefix, size):
+    """Reserva ``size`` números en una conexión nueva con su propia transacción.
+
+    El lock de la fila dura lo que la reserva; el bloque queda confirmado
+    aunque después vuelva atrás la transacción que lo pidió (quedan huecos).
+    """
+    connection = connections.create_connection(using)
+    quote = connection.ops.quote_name
+    table = quote(OrderNumberSequence._meta.db_table)
+    prefix_column, value_column = quote('prefix'), quote('last_value')
+    lock = connection.ops.for_update_sql() if connection.features.has_select_for_update else ''
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} {table} '
+                f'({prefix_column}, {value_column}) VALUES (%s, 0) '
+                f'{connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, None, None)}',
+                [prefix],
+            )
+        connection.set_autocommit(False)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {value_column} FROM {table} WHERE {prefix_column} = %s {lock}',
+                [prefix],
+            )
+            start = cursor.fetchone()[0] + 1
+            cursor.execute(
+                f'UPDATE {table} SET {value_column} = %s WHERE {prefix_column} = %s',
+                [start + size - 1, prefix],
+            )
+        connection.commit()
+    finally:
+        connection.close()
+    return start
+
+
+order_numbers = OrderNumberAllocator()
@@ -0,0 +1,95 @@
+import datetime
+import re
+
+from django.db import connection
+
+from orders.models import Order, OrderDetail, OrderDetailCard
+from orders.search import order_search
+from orders.serializers import OrderSummarySerializer
+
+SQLITE_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)(.*)')
+SQLITE_INDEX_SCAN = re.compile(r'\s+USING (?:COVERING )?INDEX\b')
+# Tabla virtual (FTS5) consultada con MATCH: ``INDEX 0:M1``; sin MATCH queda ``INDEX 0:``.
+SQLITE_VIRTUAL_INDEX = re.compile(r'VIRTUAL TABLE INDEX \d+:\S')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def order_workload():
+    """Consultas capturadas de OrderViewSet y OrderAdmin, con nombre.
+
+    Las búsquedas de texto van por orders.search (FTS5 / pg_trgm).
+    """
+    sample = Order._base_manager.order_by('-id').values(
+        'id', 'status', 'payment_status_id', 'shipping_city', 'created_at',
+        'order_number', 'shipping_phone', 'user_id',
+    ).first()
+    if sample is None:
+        return []
+
+    active = Order.objects.all()
+    admin_ordering = ('-created_at', '-id')
+    since = sample['created_at'] - datetime.timedelta(days=7)
+    order_ids = [sample['id']]
+    return [
+        ('api:list', active.order_by('-created_at', '-id')[:21]),
+        ('api:list_next_page', active.filter(created_at__lt=sample['created_at'])
+            .order_by('-created_at', '-id')[:21]),
+        ('api:retrieve', active.filter(pk=sample['id'])),
+        ('api:mine', active.filter(user_id=sample['user_id']).order_by('-created_at', '-id')
+            .only(*OrderSummarySerializer.Meta.fields)[:21]),
+        ('api:standard_items', OrderDetail.objects.filter(order_id__in=order_ids)),
+        ('api:card_items', OrderDetailCard.objects.filter(order_id__in=order_ids)),
+        ('api:order_details', OrderDetail.objects.order_by('-id')[:21]),
+        ('api:order_detail_cards', OrderDetailCard.objects.order_by('-id')[:21]),
+        ('admin:changelist', Order.all_objects.order_by(*admin_ordering)[:100]),
+        ('admin:filter_status', Order.all_objects.filter(status=sample['status'])
+            .order_by(*admin_ordering)[:100]),
+        ('admin:filter_payment_status', Order.all_objects.filter(
+            payment_status_id=sample['payment_status_id']).order_by(*admin_ordering)[:100]),
+        ('admin:filter_city', Order.all_objects.filter(
+            shipping_city=sample['shipping_city']).order_by(*admin_ordering)[:100]),
+        ('admin:filter_created_at', Order.all_objects.filter(created_at__gte=since)
+            .order_by(*admin_ordering)[:100]),
+        ('admin:created_at_bounds', Order.all_objects.values_list('created_at', flat=True)
+            .order_by('created_at')[:1]),
+        ('admin:count_filtered', Order.all_objects.filter(status=sample['status'])
+            .order_by()[:10000]),
+        ('admin:city_choices', Order.all_objects.filter(shipping_city__gt=sample['shipping_city'])
+            .order_by('shipping_city').values_list('shipping_city', flat=True)[:1]),
+        ('api:search', order_search.filter(active, sample['order_number'])
+            .order_by('-created_at', '-id')[:21]),
+        ('admin:search', order_search.filter(Order.all_objects.all(), sample['shipping_phone'])
+            .order_by(*admin_ordering)[:100]),
+        ('admin:inline_standard_items', OrderDetail.objects.filter(order_id=sample['id'])),
+        ('admin:inline_card_items', OrderDetailCard.objects.filter(order_id=sample['id'])),
+    ]
+
+
+def full_scans(plan, vendor=None):
+    """Devuelve las líneas del plan que recorren una tabla completa.
+
+    En SQLite solo no cuenta el ``SCAN`` que recorre un índice (``USING
+    INDEX`` / ``USING COVERING INDEX``): con LIMIT corta en cuanto junta las
+    filas. Un ``SCAN`` de la tabla con filtro y LIMIT puede leerla entera
+    antes de encontrarlas.
+    """
+    vendor = vendor or connection.vendor
+    scans = []
+    for line in plan.splitlines():
+        if vendor == 'sqlite':
+            match = SQLITE_SCAN.search(line)
+            if match and not SQLITE_INDEX_SCAN.match(match.group(2)) and not SQLITE_VIRTUAL_INDEX.search(line):
+                scans.append(line.strip())
+        elif vendor == 'postgresql' and POSTGRES_SCAN.search(line):
+            scans.append(line.strip())
+    return scans
+
+
+def check_order_query_plans():
+    """Corre EXPLAIN sobre el workload y devuelve ``{nombre: líneas con scan completo}``."""
+    problems = {}
+    for name, queryset in order_workload():
+        scans = full_scans(queryset.explain())
+        if scans:
+            problems[name] = scans
+    return problems
@@ -0,0 +1,47 @@
+from django.db.models import (
+    Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+
+from orders.models import Order, OrderDetail, OrderDetailCard
+
+MONEY = DecimalField(max_digits=10, decimal_places=2)
+
+
+def _active_items_sum(model, amount):
+    items = (
+        model._base_manager
+        .filter(order=OuterRef('pk'), is_active=True)
+        .order_by()
+        .values('order')
+        .annotate(amount=Sum(amount, output_field=MONEY))
+        .values('amount')
+    )
+    return Coalesce(Subquery(items, output_field=MONEY), Value(0, output_field=MONEY))
+
+
+def standard_items_total():
+    return _active_items_sum(OrderDetail, F('quantity') * F('unit_price'))
+
+
+def card_items_total():
+    price = Case(
+        When(offer=True, then=F('unit_price') - F('discount')),
+        default=F('unit_price'),
+        output_field=MONEY,
+    )
+    return _active_items_sum(OrderDetailCard, F('quantity') * price)
+
+
+def recompute_order_totals(queryset):
+    """Recalcula con dos UPDATE los totales guardados de las órdenes del queryset."""
+    queryset = queryset.order_by()
+    updated = queryset.update(
+        total_standard=standard_items_total(),
+        total_card=card_items_total(),
+    )
+    if updated:
+        queryset.update(
+            total=F('total_standard') + F('total_card') + F('shipping_cost') + F('tax_amount')
+        )
+    return updated
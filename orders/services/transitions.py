@@ -0,0 +1,60 @@
+from django.db import transaction
+
+from orders.models import Order, OrderStatusHistory
+
+ALLOWED_TRANSITIONS = {
+    'pending': {'confirmed', 'cancelled'},
+    'confirmed': {'processing', 'shipped', 'cancelled'},
+    'processing': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+
+def can_transition(from_status, to_status):
+    return to_status in ALLOWED_TRANSITIONS.get(from_status, set())
+
+
+def allowed_sources(to_status):
+    return [status for status, targets in ALLOWED_TRANSITIONS.items() if to_status in targets]
+
+
+def transition_orders(order_ids, to_status, user=None, chunk_size=1000):
+    """Pasa las órdenes a ``to_status`` en lotes, con un UPDATE y un INSERT por lote.
+
+    El UPDATE está condicionado al estado actual, así una orden que cambió de
+    estado en el medio no se pisa. Devuelve ``(actualizadas, salteadas)``,
+    donde ``salteadas`` es una lista de ``{'id', 'status', 'reason'}``.
+    """
+    if to_status not in ALLOWED_TRANSITIONS:
+        raise ValueError(f'Estado desconocido: {to_status}')
+
+    sources = allowed_sources(to_status)
+    user_id = getattr(user, 'pk', None)
+    order_ids = list(dict.fromkeys(order_ids))
+    updated = 0
+    skipped = []
+    for start in range(0, len(order_ids), chunk_size):
+        chunk = order_ids[start:start + chunk_size]
+        with transaction.atomic():
+            current = dict(
+                Order.objects.select_for_update()
+                .filter(pk__in=chunk)
+                .values_list('pk', 'status')
+            )
+            eligible = [pk for pk in chunk if current.get(pk) in sources]
+            updated += Order.objects.filter(pk__in=eligible, status__in=sources).update(status=to_status)
+            OrderStatusHistory.objects.bulk_create([
+                OrderStatusHistory(
+                    order_id=pk, from_status=current[pk], to_status=to_status, changed_by_id=user_id
+                )
+                for pk in eligible
+            ], batch_size=chunk_size)
+
+        for pk in chunk:
+            if pk not in current:
+                skipped.append({'id': pk, 'status': None, 'reason': 'not_found'})
+            elif current[pk] not in sources:
+                skipped.append({'id': pk, 'status': current[pk], 'reason': 'invalid_transition'})
+    return updated, skipped
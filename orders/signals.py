@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+
+from ecommers.batching import CommitBatch
+from ecommers.versions import bump_table_version
+from .models import Product, CardInfo, FinancingPlan, Order
+from .reference_data import REFERENCE_MODELS
+from .search import ORDER_SEARCH_FIELDS, USER_SEARCH_FIELDS, order_search
+
+# Tablas con versión: las de referencia (cache en memoria) y las que se
+# sirven con ETag desde orders.views. FinancingPlan además invalida las tablas
+# de orders.services.installments.
+VERSIONED_MODELS = REFERENCE_MODELS + (Product, CardInfo, FinancingPlan)
+
+
+def bump_version(sender, using=None, **kwargs):
+    bump_table_version(sender, using=using)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_version, sender=model)
+    post_delete.connect(bump_version, sender=model)
+
+
+# -------- ÍNDICE DE BÚSQUEDA DE ÓRDENES -------- #
+# Los bulk_create/update no disparan señales: quien los usa indexa a mano.
+# Las órdenes guardadas se indexan juntas al confirmar la transacción, así el
+# INSERT de la orden sigue siendo una sola consulta.
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(set(update_fields) & set(fields))
+
+
+def _index_orders(pks, using):
+    order_search.index(Order._base_manager.using(using).filter(pk__in=pks))
+
+
+pending_order_index = CommitBatch(_index_orders)
+
+
+def index_order(sender, instance, created=False, update_fields=None, using=None, **kwargs):
+    if created or _touches(update_fields, ORDER_SEARCH_FIELDS):
+        pending_order_index.add([instance.pk], using=using)
+
+
+def unindex_order(sender, instance, using=None, **kwargs):
+    order_search.remove([instance.pk], using=using)
+
+
+def reindex_user_orders(sender, instance, created=False, update_fields=None, using=None, **kwargs):
+    if not created and _touches(update_fields, USER_SEARCH_FIELDS):
+        order_search.index(Order._base_manager.using(using).filter(user_id=instance.pk))
+
+
+post_save.connect(index_order, sender=Order)
+post_delete.connect(unindex_order, sender=Order)
+post_save.connect(reindex_user_orders, sender=get_user_model())
@@ -0,0 +1,2 @@
+# Módulo que importa el worker de Celery (autodiscover_tasks) para registrar las tareas.
+from .jobs import run_job  # noqa: F401
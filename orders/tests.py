@@ -1,3 +1,1093 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from ecommers.admin import EstimatedCountPaginator
+from ecommers.versions import table_version
+
+from .admin import shipping_city_facets
+from .models import (
+    AdminJob, ArchivedOrder, ArchivedOrderItem, FinancingPlan,
+    Product, PaymentMethod, PaymentStatus, Persona, Company,
+    FiscalCondition, CardInfo, Order, OrderDetail, OrderDetailCard, OrderNumberSequence,
+    OrderStatusHistory, IdempotencyKey
+)
+from .jobs import run_job, start_job
+from .reference_data import reference_data
+from .search import order_search
+from .serializers import OrderSerializer, OrderSummarySerializer
+from .services.numbering import OrderNumberAllocator, _reserve_on_own_connection, order_numbers
+from .services.query_plans import check_order_query_plans, full_scans
+
+User = get_user_model()
+
+CITIES = ['Córdoba', 'Buenos Aires', 'Rosario', 'Mendoza', 'Salta', 'Neuquén', 'Tucumán']
+
+# Órdenes sintéticas del chequeo de planes; QUERY_PLAN_SEED_ORDERS=1000000
+# lo corre sobre el volumen real.
+QUERY_PLAN_SEED_ORDERS = int(os.environ.get('QUERY_PLAN_SEED_ORDERS', 200))
+
+
+def seed_orders(count, chunk_size=5000):
+    """Inserta ``count`` órdenes sintéticas con un item de cada tipo."""
+    user = User.objects.order_by('pk').first() or User.objects.create_user(username='seed')
+    company = Company.objects.first() or Company.objects.create(name='Seed')
+    persona = Persona.objects.first() or Persona.objects.create(name='Seed')
+    fiscal_condition = FiscalCondition.objects.first() or FiscalCondition.objects.create(name='Seed')
+    payment_statuses = list(PaymentStatus.objects.all()) or [
+        PaymentStatus.objects.create(name=name) for name in ('pending', 'paid', 'failed')
+    ]
+    payment_method = PaymentMethod.objects.first() or PaymentMethod.objects.create(name='Seed')
+    card_info = CardInfo.objects.first() or CardInfo.objects.create(
+        payment_method=payment_method, card_holder='Seed', card_number='0000',
+        expiration=datetime.date(2030, 1, 1),
+    )
+    product = Product.objects.first() or Product.objects.create(name='Seed', price=Decimal('10.00'))
+
+    statuses = [choice for choice, _ in Order.STATUS_CHOICES]
+    now = timezone.now()
+    created = 0
+    while created < count:
+        size = min(chunk_size, count - created)
+        numbers = order_numbers.allocate_many('SEED', size)
+        orders = [
+            Order(
+                user=user, company=company, persona=persona, fiscal_condition=fiscal_condition,
+                payment_status=random.choice(payment_statuses), status=random.choice(statuses),
+                order_number=number, shipping_city=random.choice(CITIES),
+                shipping_phone=f'351{random.randrange(10 ** 7):07d}',
+                is_active=random.random() > 0.05,
+                total_standard=Decimal('20.00'), total_card=Decimal('10.00'), total=Decimal('30.00'),
+            )
+            for number in numbers
+        ]
+        with transaction.atomic():
+            Order.objects.bulk_create(orders, batch_size=1000)
+            # auto_now_add pisa created_at en el INSERT; se reparte en el tiempo después.
+            for order in orders:
+                order.created_at = now - datetime.timedelta(minutes=random.randrange(60 * 24 * 730))
+            Order.objects.bulk_update(orders, ['created_at'], batch_size=1000)
+            order_search.index(Order._base_manager.filter(pk__in=[order.pk for order in orders]), replace=False)
+            OrderDetail.objects.bulk_create([
+                OrderDetail(order=order, product=product, quantity=2, unit_price=Decimal('10.00'))
+                for order in orders
+            ], batch_size=1000)
+            OrderDetailCard.objects.bulk_create([
+                OrderDetailCard(
+                    order=order, product=product, card_info=card_info, cuotas=1,
+                    quantity=1, installments=1, unit_price=Decimal('10.00'),
+                )
+                for order in orders
+            ], batch_size=1000)
+        created += size
+    return created
+
+
+
+class OrderFixturesMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='cliente', password='secreto')
+        cls.company = Company.objects.create(name='Empresa')
+        cls.persona = Persona.objects.create(name='Consumidor final')
+        cls.payment_status = PaymentStatus.objects.create(name='pending')
+        cls.fiscal_condition = FiscalCondition.objects.create(name='Monotributo')
+        cls.payment_method = PaymentMethod.objects.create(name='Visa')
+        cls.card_info = CardInfo.objects.create(
+            payment_method=cls.payment_method, card_holder='Cliente',
+            card_number='4111111111111111', expiration=datetime.date(2030, 1, 1)
+        )
+        cls.product = Product.objects.create(name='Mate', price=Decimal('100.00'))
+
+    def create_order(self, number, **kwargs):
+        data = {
+            'user': self.user, 'company': self.company, 'persona': self.persona,
+            'payment_status': self.payment_status, 'fiscal_condition': self.fiscal_condition,
+            'order_number': f'TEST{number:06d}',
+        }
+        data.update(kwargs)
+        return Order.objects.create(**data)
+
+    def create_items(self, order):
+        OrderDetail.objects.create(order=order, product=self.product, quantity=2, unit_price=Decimal('100.00'))
+        OrderDetail.objects.create(
+            order=order, product=self.product, quantity=1, unit_price=Decimal('50.00'), is_active=False
+        )
+        OrderDetailCard.objects.create(
+            order=order, product=self.product, card_info=self.card_info, cuotas=3,
+            quantity=1, installments=3, unit_price=Decimal('90.00')
+        )
+
+
+class OrderListQueryCountTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_orders(self, count, start=0):
+        for number in range(start, start + count):
+            self.create_items(self.create_order(number))
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        self.create_orders(2)
+        with self.assertNumQueries(3) as small_page:
+            response = self.client.get('/api/orders/api/orders/')
+        self.assertEqual(response.status_code, 200)
+
+        self.create_orders(18, start=2)
+        with self.assertNumQueries(len(small_page.captured_queries)):
+            response = self.client.get('/api/orders/api/orders/')
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_list_only_serializes_active_items(self):
+        self.create_orders(1)
+        response = self.client.get('/api/orders/api/orders/')
+        order = response.data['results'][0]
+        self.assertEqual(len(order['standard_items']), 1)
+        self.assertEqual(len(order['card_items']), 1)
+        self.assertEqual(Decimal(order['total_standard']), Decimal('200.00'))
+        self.assertEqual(Decimal(order['total_card']), Decimal('90.00'))
+
+    def test_list_uses_cursor_pagination_without_count(self):
+        self.create_orders(3)
+        response = self.client.get('/api/orders/api/orders/', {'page_size': 2})
+        self.assertNotIn('count', response.data)
+        first_page = [order['id'] for order in response.data['results']]
+        response = self.client.get(response.data['next'])
+        second_page = [order['id'] for order in response.data['results']]
+        self.assertEqual(len(first_page + second_page), 3)
+        self.assertFalse(set(first_page) & set(second_page))
+
+    def test_page_number_pagination_is_opt_in(self):
+        self.create_orders(3)
+        response = self.client.get('/api/orders/api/orders/', {'page': 1})
+        self.assertEqual(response.data['count'], 3)
+
+    def test_retrieve_uses_prefetched_items(self):
+        self.create_orders(1)
+        order = Order.objects.get()
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/orders/api/orders/{order.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+
+class StoredOrderTotalsTests(OrderFixturesMixin, TestCase):
+
+    def test_item_writes_apply_deltas_to_order(self):
+        order = self.create_order(1, shipping_cost=Decimal('10.00'))
+        self.create_items(order)
+        order.refresh_from_db()
+        self.assertEqual(order.total_standard, Decimal('200.00'))
+        self.assertEqual(order.total_card, Decimal('90.00'))
+        self.assertEqual(order.total, Decimal('300.00'))
+
+        item = order.standard_items.get(is_active=True)
+        item.quantity = 3
+        item.save()
+        card_item = order.card_items.get()
+        card_item.is_active = False
+        card_item.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total_standard, Decimal('300.00'))
+        self.assertEqual(order.total_card, Decimal('0.00'))
+        self.assertEqual(order.total, Decimal('310.00'))
+
+        item.delete()
+        order.refresh_from_db()
+        self.assertEqual(order.total, Decimal('10.00'))
+
+    def test_stale_order_save_keeps_item_totals(self):
+        order = self.create_order(1)
+        stale = Order.objects.get(pk=order.pk)
+        self.create_items(order)
+        stale.tax_amount = Decimal('5.00')
+        with self.assertNumQueries(1):
+            stale.save()
+        # Los totales se leen juntos, en un solo SELECT, al usarlos.
+        with self.assertNumQueries(1):
+            self.assertEqual(stale.total, Decimal('295.00'))
+            self.assertEqual(stale.total_standard, Decimal('200.00'))
+            self.assertEqual(stale.total_card, Decimal('90.00'))
+
+    def test_items_after_order_save_are_not_counted_twice(self):
+        order = self.create_order(1)
+        order.shipping_cost = Decimal('10.00')
+        order.save()
+        self.create_items(order)
+        self.assertEqual(order.total, Decimal('300.00'))
+
+    def test_bulk_item_update_recomputes_totals(self):
+        order = self.create_order(1)
+        self.create_items(order)
+        OrderDetail.all_objects.filter(order=order).update(is_active=True)
+        order.refresh_from_db()
+        self.assertEqual(order.total_standard, Decimal('250.00'))
+
+    def test_recompute_command_repairs_drift(self):
+        order = self.create_order(1)
+        self.create_items(order)
+        Order.objects.filter(pk=order.pk).update(total_standard=0, total_card=0, total=0)
+        self.create_order(2)
+        output = StringIO()
+        call_command('recompute_order_totals', chunk_size=1, stdout=output)
+        order.refresh_from_db()
+        self.assertEqual(order.total, Decimal('290.00'))
+        self.assertIn(': 1 recalculadas (2 en total).', output.getvalue())
+
+
+class OrderNumberAllocatorTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        order_numbers.reset()
+
+    def test_new_orders_get_distinct_numbers_in_one_insert(self):
+        first = self.create_order(0, order_number='')
+        # El índice de búsqueda se escribe recién al confirmar la transacción.
+        with self.assertNumQueries(1):
+            second = self.create_order(0, order_number='')
+        self.assertEqual(first.order_number, 'ORD000001')
+        self.assertEqual(second.order_number, 'ORD000002')
+
+    def test_blocks_are_reserved_per_prefix(self):
+        allocator = OrderNumberAllocator(block_size=3)
+        self.assertEqual(allocator.allocate_many('A', 4), ['A000001', 'A000002', 'A000003', 'A000004'])
+        self.assertEqual(allocator.allocate('B'), 'B000001')
+        self.assertEqual(OrderNumberSequence.objects.get(prefix='A').last_value, 4)
+        self.assertEqual(allocator.allocate('A'), 'A000005')
+
+    @override_settings(ORDER_NUMBER_PER_COMPANY=True)
+    def test_company_prefix(self):
+        order = self.create_order(0, order_number='')
+        self.assertEqual(order.order_number, f'ORD{self.company.pk}-000001')
+
+    def test_rolled_back_block_is_discarded(self):
+        allocator = OrderNumberAllocator(block_size=10)
+        try:
+            with transaction.atomic():
+                allocator.allocate('R')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        OrderNumberSequence.objects.create(prefix='R', last_value=10)
+        self.assertEqual(allocator.allocate('R'), 'R000011')
+
+    def test_blocks_inside_a_transaction_use_their_own_connection_with_row_locks(self):
+        allocator = OrderNumberAllocator(block_size=10)
+        with mock.patch.object(connection.features, 'has_select_for_update', True), \
+                mock.patch('orders.services.numbering._reserve_on_own_connection', return_value=41) as reserve:
+            self.assertEqual(allocator.allocate('L'), 'L000041')
+        reserve.assert_called_once_with('default', 'L', 10)
+        self.assertFalse(OrderNumberSequence.objects.filter(prefix='L').exists())
+
+
+class OwnConnectionReservationTests(TransactionTestCase):
+
+    def test_reserves_consecutive_blocks_and_commits(self):
+        self.assertEqual(_reserve_on_own_connection('default', 'P', 5), 1)
+        self.assertEqual(_reserve_on_own_connection('default', 'P', 5), 6)
+        self.assertEqual(OrderNumberSequence.objects.get(prefix='P').last_value, 10)
+
+
+class BulkOrderIngestionTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        order_numbers.reset()
+
+    def order_payload(self, **overrides):
+        payload = {
+            'company': self.company.pk, 'persona': self.persona.pk,
+            'payment_status': self.payment_status.pk,
+            'fiscal_condition': self.fiscal_condition.pk,
+            'shipping_cost': '10.00',
+            'standard_items': [
+                {'product': self.product.pk, 'quantity': 2, 'unit_price': '100.00'},
+            ],
+            'card_items': [
+                {'product': self.product.pk, 'card_info': self.card_info.pk, 'cuotas': 3,
+                 'quantity': 1, 'installments': 3, 'unit_price': '90.00',
+                 'offer': True, 'discount': '10.00'},
+            ],
+        }
+        payload.update(overrides)
+        return payload
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        order_numbers.allocate('ORD')
+        with CaptureQueriesContext(connection) as small_batch:
+            response = self.client.post(
+                '/api/orders/api/orders/bulk/', [self.order_payload()] * 2, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        with self.assertNumQueries(len(small_batch.captured_queries)):
+            response = self.client.post(
+                '/api/orders/api/orders/bulk/', [self.order_payload()] * 30, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.count(), 32)
+        self.assertEqual(OrderDetail.objects.count(), 32)
+        order = Order.objects.get(pk=response.data['created'][0]['id'])
+        self.assertEqual(order.total_standard, Decimal('200.00'))
+        self.assertEqual(order.total_card, Decimal('80.00'))
+        self.assertEqual(order.total, Decimal('290.00'))
+
+    def test_invalid_orders_are_reported_without_failing_the_batch(self):
+        payload = [
+            self.order_payload(),
+            self.order_payload(company=999),
+            self.order_payload(standard_items=[{'product': 999, 'quantity': 1, 'unit_price': '1.00'}]),
+            self.order_payload(persona='x'),
+        ]
+        response = self.client.post('/api/orders/api/orders/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([row['index'] for row in response.data['created']], [0])
+        errors = {row['index']: row['errors'] for row in response.data['errors']}
+        self.assertIn('company', errors[1])
+        self.assertIn('product', errors[2]['standard_items'][0])
+        self.assertIn('persona', errors[3])
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class OrderQueryPlanTests(TestCase):
+
+    def test_workload_does_not_scan_full_tables(self):
+        seed_orders(QUERY_PLAN_SEED_ORDERS)
+        self.assertEqual(check_order_query_plans(), {})
+
+    def test_full_scan_detection(self):
+        self.assertEqual(full_scans('2 0 0 SCAN orders_order', 'sqlite'), ['2 0 0 SCAN orders_order'])
+        self.assertEqual(full_scans('2 0 0 SCAN orders_order USING INDEX order_city_idx', 'sqlite'), [])
+        self.assertEqual(full_scans('2 0 0 SCAN orders_order USING COVERING INDEX order_created_idx', 'sqlite'), [])
+        # Con filtro y LIMIT un SCAN de la tabla igual puede leerla entera.
+        limited = Order.all_objects.filter(total__gt=0).order_by('-id')[:21].explain()
+        if connection.vendor == 'sqlite':
+            self.assertEqual(len(full_scans(limited)), 1)
+        self.assertEqual(len(full_scans('Seq Scan on orders_order  (cost=0.00..1.00)', 'postgresql')), 1)
+
+
+class SparseFieldsetTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.create_items(self.create_order(1))
+
+    def test_compact_list_skips_item_tables(self):
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get(
+                '/api/orders/api/orders/', {'fields': 'order_number,status,total,created_at'}
+            )
+        self.assertEqual(
+            set(response.data['results'][0]), {'order_number', 'status', 'total', 'created_at'}
+        )
+        self.assertNotIn('notes', queries.captured_queries[0]['sql'])
+
+    def test_expand_items_with_nested_fields(self):
+        response = self.client.get(
+            '/api/orders/api/orders/',
+            {'fields': 'order_number,standard_items.quantity', 'expand': 'items'},
+        )
+        order = response.data['results'][0]
+        self.assertEqual(set(order), {'order_number', 'standard_items', 'card_items'})
+        self.assertEqual(set(order['standard_items'][0]), {'quantity'})
+        self.assertIn('unit_price', order['card_items'][0])
+
+    def test_empty_expand_collapses_items(self):
+        response = self.client.get('/api/orders/api/orders/', {'expand': ''})
+        order = response.data['results'][0]
+        self.assertNotIn('standard_items', order)
+        self.assertIn('total_amount', order)
+
+    def test_default_response_keeps_items(self):
+        response = self.client.get('/api/orders/api/orders/')
+        self.assertIn('card_items', response.data['results'][0])
+
+    def test_item_endpoint_fields(self):
+        response = self.client.get('/api/orders/api/order-details/', {'fields': 'id,subtotal'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'subtotal'})
+
+
+class OrderExportTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.order = self.create_order(1)
+        self.create_items(self.order)
+        self.create_order(2, status='cancelled')
+
+    def read_stream(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_flattens_items(self):
+        response = self.client.get('/api/orders/api/orders/export/', {'status': 'pending'})
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(StringIO(self.read_stream(response))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row['item_type'] for row in rows}, {'standard', 'card'})
+        self.assertEqual({row['order_number'] for row in rows}, {self.order.order_number})
+
+    def test_ndjson_export_with_date_range(self):
+        today = self.order.created_at.date()
+        response = self.client.get('/api/orders/api/orders/export/', {
+            'output': 'ndjson', 'date_from': today.isoformat(), 'date_to': today.isoformat(),
+        })
+        rows = [json.loads(line) for line in self.read_stream(response).splitlines()]
+        self.assertEqual(len(rows), 3)
+        response = self.client.get('/api/orders/api/orders/export/', {
+            'output': 'ndjson', 'date_to': (today - datetime.timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(self.read_stream(response), '')
+
+    def test_invalid_filters(self):
+        response = self.client.get('/api/orders/api/orders/export/', {'status': 'lost'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_orders', output_format='ndjson', status='cancelled', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['item_type'] for row in rows], [None])
+
+
+class OrderStatusTransitionTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_transition_only_moves_allowed_orders(self):
+        pending = [self.create_order(number) for number in range(3)]
+        delivered = self.create_order(10, status='delivered')
+        ids = [order.pk for order in pending] + [delivered.pk, 999]
+
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                '/api/orders/api/orders/transition/', {'ids': ids, 'status': 'confirmed'}, format='json'
+            )
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(
+            [(row['id'], row['reason']) for row in response.data['skipped']],
+            [(delivered.pk, 'invalid_transition'), (999, 'not_found')],
+        )
+        self.assertEqual(Order.objects.filter(status='confirmed').count(), 3)
+        history = OrderStatusHistory.objects.filter(to_status='confirmed')
+        self.assertEqual(history.count(), 3)
+        self.assertEqual({row.from_status for row in history}, {'pending'})
+
+    def test_update_rejects_invalid_transition_and_records_valid_one(self):
+        order = self.create_order(1)
+        url = f'/api/orders/api/orders/{order.pk}/'
+        response = self.client.patch(url, {'status': 'delivered'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(url, {'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(order.status_history.get().changed_by, self.user)
+
+
+class IdempotencyKeyTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        order_numbers.reset()
+
+    def order_data(self, **overrides):
+        data = {
+            'user': self.user.pk, 'company': self.company.pk, 'persona': self.persona.pk,
+            'payment_status': self.payment_status.pk, 'fiscal_condition': self.fiscal_condition.pk,
+        }
+        data.update(overrides)
+        return data
+
+    def post_order(self, key, **overrides):
+        return self.client.post(
+            '/api/orders/api/orders/', self.order_data(**overrides), format='json',
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_stored_response(self):
+        first = self.post_order('retry-1')
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):
+            retry = self.post_order('retry-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json()['order_number'], first.json()['order_number'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_with_other_payload(self):
+        self.post_order('retry-2')
+        response = self.post_order('retry-2', notes='otra')
+        self.assertEqual(response.status_code, 422)
+
+    def test_expired_keys_are_evicted(self):
+        self.post_order('retry-3')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post_order('retry-3').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_abandoned_request_releases_the_key(self):
+        expires_at = timezone.now() + datetime.timedelta(hours=1)
+        record = IdempotencyKey.objects.create(
+            user=self.user, key='retry-4', fingerprint='muerto', expires_at=expires_at
+        )
+        self.assertEqual(self.post_order('retry-4').status_code, 409)
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            created_at=timezone.now() - datetime.timedelta(minutes=5)
+        )
+        self.assertEqual(self.post_order('retry-4').status_code, 201)
+        retry = self.post_order('retry-4')
+        self.assertEqual((retry.status_code, retry['Idempotent-Replayed']), (201, 'true'))
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_overlong_key_is_rejected(self):
+        self.assertEqual(self.post_order('k' * 256).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class ReferenceDataCacheTests(OrderFixturesMixin, TestCase):
+
+    def order_data(self):
+        return {
+            'user': self.user.pk, 'company': self.company.pk, 'persona': self.persona.pk,
+            'payment_status': self.payment_status.pk, 'fiscal_condition': self.fiscal_condition.pk,
+        }
+
+    def test_order_validation_skips_reference_lookups(self):
+        OrderSerializer(data=self.order_data()).is_valid()
+        with self.assertNumQueries(1) as queries:
+            self.assertTrue(OrderSerializer(data=self.order_data()).is_valid())
+        self.assertIn('auth_user', queries.captured_queries[0]['sql'])
+
+    def test_writes_invalidate_the_cache(self):
+        self.assertIsNotNone(reference_data.get(Company, self.company.pk))
+        company = Company.objects.create(name='Nueva')
+        self.assertEqual(reference_data.get(Company, company.pk), company)
+        company.is_active = False
+        company.save()
+        serializer = OrderSerializer(data={**self.order_data(), 'company': company.pk})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('company', serializer.errors)
+
+    def test_rows_are_handed_out_as_copies(self):
+        first = reference_data.get(Company, self.company.pk)
+        first.name = 'Modificada'
+        self.assertEqual(reference_data.get(Company, self.company.pk).name, self.company.name)
+
+    @override_settings(TABLE_VERSION_LOCAL_TTL=5)
+    def test_process_local_versions_expire(self):
+        # Con LocMemCache un cambio hecho en otro worker no llega: la versión
+        # vence sola y la próxima lectura recarga.
+        cache.clear()
+        version = table_version(Company)
+        later = time.time() + 6
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later), \
+                mock.patch('ecommers.versions.time.time_ns', return_value=int(later * 10 ** 9)):
+            self.assertGreater(table_version(Company), version)
+
+
+class ConditionalGetTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def later(self, seconds=5):
+        # Last-Modified solo sale cuando la última escritura es de un segundo anterior.
+        return mock.patch('ecommers.conditional.time.time', return_value=time.time() + seconds)
+
+    def test_unchanged_table_answers_304_without_queries(self):
+        url = '/api/orders/api/companies/'
+        with self.later():
+            first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        with self.later():
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_in_the_same_second_is_not_hidden_by_if_modified_since(self):
+        url = '/api/orders/api/companies/'
+        same_second = table_version(Company) / 10 ** 9
+        with mock.patch('ecommers.conditional.time.time', return_value=same_second):
+            first = self.client.get(url)
+        self.assertNotIn('Last-Modified', first)
+        Company.objects.create(name='Nueva')
+        same_second = table_version(Company) / 10 ** 9
+        with mock.patch('ecommers.conditional.time.time', return_value=same_second):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(same_second))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Nueva', [row['name'] for row in response.data['results']])
+
+    def test_write_changes_the_etag(self):
+        url = '/api/orders/api/products/'
+        first = self.client.get(url)
+        other = self.client.get(url, {'format': 'json'})
+        self.assertNotEqual(first['ETag'], other['ETag'])
+        Product.objects.create(name='Otro', price=Decimal('5.00'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+
+class OrderArchiveTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_archives_inactive_and_old_orders(self):
+        inactive = self.create_order(1, is_active=False)
+        self.create_items(inactive)
+        old = self.create_order(2, status='delivered')
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - datetime.timedelta(days=1000))
+        hot = self.create_order(3)
+        self.create_items(hot)
+        total = Order.objects.get(pk=hot.pk).total
+
+        call_command('archive_orders', '--sleep=0', '--batch-size=1', stdout=StringIO())
+
+        self.assertEqual(list(Order.objects.values_list('pk', flat=True)), [hot.pk])
+        self.assertEqual(set(ArchivedOrder.objects.values_list('pk', flat=True)), {inactive.pk, old.pk})
+        self.assertEqual(len(ArchivedOrder.objects.get(pk=inactive.pk).data['standard_items']), 2)
+        self.assertFalse(OrderDetail.all_objects.filter(is_active=False).exists())
+        self.assertEqual(ArchivedOrderItem.objects.get().order_id, hot.pk)
+        self.assertEqual(Order.objects.get(pk=hot.pk).total, total)
+
+    def test_api_reads_through_to_archive(self):
+        order = self.create_order(1, status='cancelled')
+        self.create_items(order)
+        expected = self.client.get(f'/api/orders/api/orders/{order.pk}/').json()
+        Order.objects.filter(pk=order.pk).update(is_active=False)
+        expected['is_active'] = False
+        call_command('archive_orders', '--sleep=0', stdout=StringIO())
+
+        response = self.client.get(f'/api/orders/api/orders/{order.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Archived'], 'true')
+        self.assertEqual(response.json(), expected)
+        self.assertEqual(self.client.get('/api/orders/api/orders/999999/').status_code, 404)
+
+
+class SoftDeleteTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_destroy_marks_order_and_items_inactive(self):
+        order = self.create_order(1)
+        self.create_items(order)
+        order.refresh_from_db()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(f'/api/orders/api/orders/{order.pk}/')
+        self.assertEqual(response.status_code, 204)
+        # get_object + un UPDATE por tabla de items + el de la orden. El
+        # atomic de delete() acá es un savepoint porque el test corre en una
+        # transacción; en un request es la transacción misma.
+        statements = [query['sql'] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 4)
+
+        self.assertFalse(Order.objects.filter(pk=order.pk).exists())
+        deleted = Order.all_objects.get(pk=order.pk)
+        self.assertFalse(deleted.is_active)
+        self.assertFalse(OrderDetail.objects.filter(order=order).exists())
+        self.assertEqual(OrderDetail.all_objects.filter(order=order).count(), 2)
+        # Los totales guardados no se tocan: son el total histórico de la orden.
+        self.assertEqual(
+            (deleted.total_standard, deleted.total_card, deleted.total),
+            (order.total_standard, order.total_card, order.total),
+        )
+        self.assertGreater(deleted.total, 0)
+
+    def test_bulk_item_delete_is_an_update(self):
+        order = self.create_order(1)
+        self.create_items(order)
+        with CaptureQueriesContext(connection) as queries:
+            count, _ = OrderDetailCard.objects.filter(order=order).delete()
+        self.assertEqual(count, 1)
+        self.assertFalse(any(q['sql'].startswith('DELETE') for q in queries.captured_queries))
+        order.refresh_from_db()
+        self.assertEqual(order.total_card, Decimal('0.00'))
+        self.assertEqual(OrderDetailCard.all_objects.filter(order=order).count(), 1)
+
+    def test_hard_delete_removes_rows(self):
+        order = self.create_order(1)
+        self.create_items(order)
+        OrderDetail.all_objects.filter(order=order).hard_delete()
+        order.refresh_from_db()
+        self.assertEqual(order.total_standard, Decimal('0.00'))
+        self.assertFalse(OrderDetail.all_objects.exists())
+
+
+class OrderSearchTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        response = self.client.get('/api/orders/api/orders/', {'q': text})
+        return [order['order_number'] for order in response.json()['results']]
+
+    def create_order(self, number, **kwargs):
+        # Las órdenes se indexan al confirmar la transacción.
+        with self.captureOnCommitCallbacks(execute=True):
+            return super().create_order(number, **kwargs)
+
+    def test_orders_are_indexed_together_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                OrderFixturesMixin.create_order(self, 1)
+                OrderFixturesMixin.create_order(self, 2)
+            self.assertEqual(self.search('TEST'), [])
+        # Un DELETE + un INSERT para las dos órdenes (en su savepoint).
+        with self.assertNumQueries(4):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.search('TEST'), ['TEST000002', 'TEST000001'])
+
+    def test_api_search_by_number_phone_and_user(self):
+        self.create_order(1, shipping_phone='3515551234')
+        self.create_order(2, shipping_phone='3519990000')
+        self.assertEqual(self.search('000002'), ['TEST000002'])
+        self.assertEqual(self.search('555123'), ['TEST000001'])
+        self.assertEqual(self.search('clie test000001'), ['TEST000001'])
+        self.assertEqual(self.search('ab'), [])
+
+    def test_index_follows_writes(self):
+        order = self.create_order(1)
+        self.user.username = 'renombrado'
+        self.user.save()
+        self.assertEqual(self.search('renombrado'), ['TEST000001'])
+        order.order_number = 'OTRO000001'
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+        self.assertEqual(self.search('OTRO'), ['OTRO000001'])
+        Order.all_objects.filter(pk=order.pk).hard_delete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM orders_order_search')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_other_vendors_skip_the_index_and_use_icontains(self):
+        self.create_order(1, shipping_phone='3515551234')
+        self.create_order(2)
+        with mock.patch.object(order_search, 'supported', return_value=False):
+            with self.assertLogs('ecommers.fulltext', 'WARNING'):
+                order_search.create(connection)
+            self.assertEqual(self.search('5551234'), ['TEST000001'])
+            self.assertNotIn('MATCH', str(order_search.filter(Order.objects.all(), 'TEST').query))
+
+    def test_admin_search_uses_index(self):
+        self.create_order(1, shipping_phone='3515551234')
+        self.create_order(2)
+        model_admin = admin.site._registry[Order]
+        queryset, may_have_duplicates = model_admin.get_search_results(
+            None, Order.all_objects.all(), '5551234'
+        )
+        self.assertFalse(may_have_duplicates)
+        self.assertIn('MATCH', str(queryset.query))
+        self.assertEqual([order.order_number for order in queryset], ['TEST000001'])
+
+
+class OrderAdminChangelistTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'secreto')
+        self.client.force_login(self.admin_user)
+
+    def test_changelist_avoids_full_table_queries(self):
+        for number, city in enumerate(['Córdoba', 'Rosario', 'Córdoba'], start=1):
+            self.create_order(number, shipping_city=city)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/orders/order/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'TEST000003')
+        sql = [q['sql'] for q in queries.captured_queries]
+        self.assertFalse([s for s in sql if 'DISTINCT' in s])
+        self.assertFalse([s for s in sql if 'COUNT(*)' in s and 'LIMIT' not in s])
+        self.assertEqual(shipping_city_facets(), ['Córdoba', 'Rosario'])
+
+    def test_facet_and_date_filters(self):
+        self.create_order(1, shipping_city='Rosario')
+        old = self.create_order(2, shipping_city='Salta')
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.make_aware(datetime.datetime(2020, 3, 5)))
+
+        response = self.client.get('/admin/orders/order/', {'shipping_city': 'Salta'})
+        self.assertContains(response, 'TEST000002')
+        self.assertNotContains(response, 'TEST000001')
+        response = self.client.get('/admin/orders/order/', {'created': '2020-03'})
+        self.assertContains(response, 'TEST000002')
+        self.assertNotContains(response, 'TEST000001')
+        for value in ('9999', '9999-12', '1'):
+            response = self.client.get('/admin/orders/order/', {'created': value})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, 'TEST000002')
+        response = self.client.get('/admin/orders/order/', {'payment_status': self.payment_status.pk})
+        self.assertContains(response, 'TEST000001')
+
+    def test_paginator_uses_estimate_without_filters(self):
+        for number in range(1, 4):
+            self.create_order(number)
+        paginator = EstimatedCountPaginator(Order.all_objects.order_by('-created_at', '-id'), 2)
+        paginator.count_limit = 2
+        self.assertEqual(paginator.count, 2)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        paginator = EstimatedCountPaginator(Order.all_objects.order_by('-created_at', '-id'), 2)
+        paginator.count_limit = 2
+        self.assertEqual(paginator.count, 3)
+
+
+class OrderAdminChangePageTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'secreto')
+        self.client.force_login(admin_user)
+        self.order = self.create_order(1)
+        OrderDetail.objects.bulk_create([
+            OrderDetail(order=self.order, product=self.product, quantity=1, unit_price=Decimal('10.00'))
+            for _ in range(25)
+        ])
+        self.url = f'/admin/orders/order/{self.order.pk}/change/'
+
+    def test_items_are_paginated(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'name="standard_items-TOTAL_FORMS" value="20"')
+        self.assertContains(response, 'items_page=2')
+        response = self.client.get(self.url, {'items_page': 2})
+        self.assertContains(response, 'name="standard_items-TOTAL_FORMS" value="5"')
+        self.assertContains(response, 'items_page=1')
+
+    def test_product_widget_does_not_list_the_catalog(self):
+        Product.objects.bulk_create([Product(name=f'Otro {n}', price=Decimal('1.00')) for n in range(30)])
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'Otro 1')
+        self.assertContains(response, 'admin-autocomplete')
+
+    def test_summary_mode_is_read_only_without_items(self):
+        Order.objects.filter(pk=self.order.pk).update(total_standard=Decimal('250.00'), total=Decimal('250.00'))
+        response = self.client.get(self.url, {'summary': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'standard_items-TOTAL_FORMS')
+        self.assertContains(response, '250.00')
+        self.assertEqual(self.client.post(f'{self.url}?summary=1', {}).status_code, 403)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, ADMIN_JOB_SYNC_LIMIT=1, ADMIN_JOB_CHUNK_SIZE=2)
+class AdminJobTests(OrderFixturesMixin, TestCase):
+
+    def setUp(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'secreto')
+        self.client.force_login(admin_user)
+        self.orders = [self.create_order(number) for number in range(1, 4)]
+
+    def run_action(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/orders/order/', {
+                'action': action, '_selected_action': [order.pk for order in self.orders],
+            })
+        self.assertEqual(response.status_code, 302)
+        return AdminJob.objects.get()
+
+    def test_large_transition_runs_as_job(self):
+        job = self.run_action('mark_as_confirmed')
+        self.assertEqual((job.status, job.processed, job.total), ('done', 3, 3))
+        self.assertEqual(job.result, {'updated': 3, 'skipped': 0})
+        self.assertEqual(Order.objects.filter(status='confirmed').count(), 3)
+        self.assertEqual(self.client.get(f'/admin/orders/adminjob/{job.pk}/change/').status_code, 200)
+
+    def test_export_job_writes_a_downloadable_file(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(ADMIN_JOB_EXPORT_DIR=directory):
+            job = self.run_action('export_selected')
+            self.assertEqual(job.result['rows'], 3)
+            response = self.client.get(f'/admin/orders/adminjob/{job.pk}/download/')
+            content = b''.join(response.streaming_content).decode()
+            response.close()
+        self.assertEqual(len(content.strip().splitlines()), 4)
+
+    def test_recompute_job_repairs_totals(self):
+        self.create_items(self.orders[0])
+        Order.objects.update(total_standard=0, total_card=0, total=0)
+        job = self.run_action('recompute_totals')
+        self.assertEqual(job.result, {'recomputed': 3})
+        self.assertEqual(Order.objects.get(pk=self.orders[0].pk).total, Decimal('290.00'))
+
+    def test_transition_job_gets_the_counted_ids(self):
+        with mock.patch('orders.admin.start_job', wraps=start_job) as started:
+            job = self.run_action('mark_as_shipped')
+        ids = started.call_args.args[1]
+        self.assertIsInstance(ids, list)
+        self.assertEqual(sorted(job.object_ids), sorted(ids))
+
+    def test_duplicate_dispatch_runs_once(self):
+        job = self.run_action('mark_as_confirmed')
+        AdminJob.objects.filter(pk=job.pk).update(status='running', processed=0)
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), ('running', 0))
+
+    def test_sweep_fails_abandoned_jobs_and_requeues_forgotten_ones(self):
+        stale = timezone.now() - datetime.timedelta(hours=1)
+        abandoned = start_job('transition', [self.orders[0].pk], status='confirmed')
+        forgotten = start_job('transition', [self.orders[1].pk], status='confirmed')
+        alive = start_job('transition', [self.orders[2].pk], status='confirmed')
+        AdminJob.objects.filter(pk=abandoned.pk).update(status='running', heartbeat_at=stale)
+        AdminJob.objects.filter(pk=forgotten.pk).update(created_at=stale)
+        AdminJob.objects.filter(pk=alive.pk).update(status='running', heartbeat_at=timezone.now())
+        self.assertEqual(self.client.get('/admin/orders/adminjob/').status_code, 200)
+        statuses = dict(AdminJob.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            (statuses[abandoned.pk], statuses[forgotten.pk], statuses[alive.pk]), ('failed', 'done', 'running')
+        )
+        self.assertEqual(Order.objects.get(pk=self.orders[1].pk).status, 'confirmed')
+
+
+class InstallmentPlanTests(OrderFixturesMixin, TestCase):
+    url = '/api/orders/api/installment-plans/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.other = Product.objects.create(name='Bombilla', price=Decimal('50.00'))
+        FinancingPlan.objects.create(payment_method=self.payment_method, installments=1)
+        FinancingPlan.objects.create(
+            payment_method=self.payment_method, installments=3, surcharge=Decimal('10'), rounding=Decimal('1.00')
+        )
+        FinancingPlan.objects.create(payment_method=self.payment_method, installments=6, interest_rate=Decimal('2'))
+        self.basket = {'items': [
+            {'product': self.product.pk, 'quantity': 2}, {'product': self.other.pk, 'quantity': 1},
+        ]}
+
+    def test_quotes_every_plan_for_the_basket(self):
+        response = self.client.post(self.url, self.basket, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['subtotal'], Decimal('250.00'))
+        plans = {plan['installments']: plan for plan in response.data['plans']}
+        self.assertEqual(sorted(plans), [1, 3, 6])
+        self.assertEqual((plans[1]['installment_amount'], plans[1]['financing_cost']), (Decimal('250.00'), 0))
+        # 10% de recargo, cuotas al peso: 275 / 3 = 91.67 -> 91 + 91 + 93.
+        self.assertEqual(
+            (plans[3]['installment_amount'], plans[3]['last_installment_amount'], plans[3]['total']),
+            (Decimal('91.00'), Decimal('93.00'), Decimal('275.00')),
+        )
+        # Sistema francés al 2% mensual.
+        self.assertEqual(
+            (plans[6]['installment_amount'], plans[6]['last_installment_amount'], plans[6]['total']),
+            (Decimal('44.63'), Decimal('44.64'), Decimal('267.79')),
+        )
+
+    def test_rounding_never_undercharges(self):
+        FinancingPlan.objects.create(payment_method=self.payment_method, installments=12, rounding=Decimal('1.00'))
+        basket = {'items': [{'product': self.other.pk, 'quantity': 2}]}
+        plan = next(
+            plan for plan in self.client.post(self.url, basket, format='json').data['plans']
+            if plan['installments'] == 12
+        )
+        self.assertEqual((plan['installment_amount'], plan['last_installment_amount']), (Decimal('8.00'), Decimal('12.00')))
+        self.assertEqual((plan['total'], plan['financing_cost']), (Decimal('100.00'), Decimal('0.00')))
+
+    def test_rounding_skips_single_payments_and_tiny_installments(self):
+        plans = {plan.installments: plan for plan in FinancingPlan.objects.all()}
+        plans[1].rounding = Decimal('1.00')
+        plans[1].save()
+        cheap = Product.objects.create(name='Yerba', price=Decimal('0.50'))
+        quotes = {
+            plan['installments']: plan
+            for plan in self.client.post(self.url, {'items': [
+                {'product': self.product.pk, 'quantity': 2}, {'product': cheap.pk, 'quantity': 1},
+            ]}, format='json').data['plans']
+        }
+        self.assertEqual(quotes[1]['installment_amount'], quotes[1]['total'])
+        self.assertEqual(quotes[1]['total'], Decimal('200.50'))
+        quotes = {
+            plan['installments']: plan
+            for plan in self.client.post(
+                self.url, {'items': [{'product': cheap.pk, 'quantity': 2}]}, format='json'
+            ).data['plans']
+        }
+        # 1.10 en 3 cuotas al peso daría 0 + 0 + 1.10: se divide al centavo.
+        self.assertEqual(
+            (quotes[3]['installment_amount'], quotes[3]['last_installment_amount'], quotes[3]['total']),
+            (Decimal('0.36'), Decimal('0.38'), Decimal('1.10')),
+        )
+
+    def test_basket_costs_one_query_once_tables_are_loaded(self):
+        self.client.post(self.url, self.basket, format='json')
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                self.url, {**self.basket, 'payment_method': self.payment_method.pk}, format='json'
+            )
+        self.assertEqual(len(response.data['plans']), 3)
+
+    def test_plan_changes_reload_the_tables(self):
+        self.client.post(self.url, self.basket, format='json')
+        FinancingPlan.objects.get(installments=6).delete()
+        response = self.client.post(self.url, self.basket, format='json')
+        self.assertEqual([plan['installments'] for plan in response.data['plans']], [1, 3])
+
+    def test_unknown_product_is_rejected(self):
+        response = self.client.post(self.url, {'items': [{'product': 999, 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class MyOrdersTests(OrderFixturesMixin, TestCase):
+    url = '/api/orders/api/orders/mine/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_lists_only_the_users_active_orders(self):
+        other = User.objects.create_user(username='otro', password='secreto')
+        orders = [self.create_order(number) for number in range(1, 4)]
+        self.create_items(orders[0])
+        self.create_order(4, user=other)
+        orders[2].delete()
+        response = self.client.get(self.url, {'page_size': 1})
+        self.assertEqual([row['id'] for row in response.data['results']], [orders[1].pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data['next'])
+        row = response.data['results'][0]
+        self.assertEqual((row['id'], row['total'], row['total_card']), (orders[0].pk, '290.00', '90.00'))
+        self.assertNotIn('standard_items', row)
+        self.assertIsNone(response.data['next'])
+
+    def test_page_is_read_from_the_covering_index(self):
+        seed_orders(50, chunk_size=50)
+        user_id = Order.objects.values_list('user_id', flat=True).first()
+        queryset = (
+            Order.objects.filter(user_id=user_id).order_by('-created_at', '-id')
+            .only(*OrderSummarySerializer.Meta.fields)[:21]
+        )
+        plan = queryset.explain()
+        if connection.vendor == 'sqlite':
+            self.assertIn('COVERING INDEX order_user_active_created_idx', plan)
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     ProductViewSet, PaymentMethodViewSet, PaymentStatusViewSet, PersonaViewSet,
-    CompanyViewSet, FiscalConditionViewSet, CardInfoViewSet,
+    CompanyViewSet, FiscalConditionViewSet, CardInfoViewSet, FinancingPlanViewSet, InstallmentPlanViewSet,
     OrderViewSet, OrderDetailViewSet, OrderDetailCardViewSet
 )
 
@@ -14,6 +14,8 @@ router.register(r'personas', PersonaViewSet)
 router.register(r'companies', CompanyViewSet)
 router.register(r'fiscal-conditions', FiscalConditionViewSet)
 router.register(r'card-info', CardInfoViewSet)
+router.register(r'financing-plans', FinancingPlanViewSet)
+router.register(r'installment-plans', InstallmentPlanViewSet, basename='installment-plans')
 router.register(r'orders', OrderViewSet)
 router.register(r'order-details', OrderDetailViewSet)
 router.register(r'order-detail-cards', OrderDetailCardViewSet)
@@ -1,62 +1,207 @@
-from rest_framework import viewsets
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import (
     Product, PaymentMethod, PaymentStatus, Persona, Company,
-    FiscalCondition, CardInfo, Order, OrderDetail, OrderDetailCard
+    FiscalCondition, CardInfo, FinancingPlan, Order, OrderDetail, OrderDetailCard
 )
 from .serializers import (
     ProductSerializer, PaymentMethodSerializer, PaymentStatusSerializer, PersonaSerializer,
     CompanySerializer, FiscalConditionSerializer, CardInfoSerializer,
-    OrderSerializer, OrderDetailSerializer, OrderDetailCardSerializer
+    OrderSerializer, OrderDetailSerializer, OrderDetailCardSerializer, OrderTransitionSerializer,
+    FinancingPlanSerializer, InstallmentQuoteSerializer, OrderSummarySerializer
 )
-
-
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.filter(is_active=True)
+from .idempotency import IdempotentCreateMixin, idempotent
+from .search import order_search
+from .services.archive import find_archived_order
+from .services.bulk import ingest_orders
+from .services.export import EXPORT_FORMATS, export_filters, export_queryset, iter_order_rows
+from .services.installments import basket_subtotal, quote_plans
+from .services.transitions import transition_orders
+from ecommers.conditional import ConditionalGetMixin
+from ecommers.pagination import CreatedAtCursorPagination, IdCursorPagination, OptInPageNumberMixin
+
+
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.order_by('pk')
     serializer_class = ProductSerializer
 
 
-class PaymentMethodViewSet(viewsets.ModelViewSet):
-    queryset = PaymentMethod.objects.filter(is_active=True)
+class PaymentMethodViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = PaymentMethod.objects.order_by('pk')
     serializer_class = PaymentMethodSerializer
 
 
-class PaymentStatusViewSet(viewsets.ModelViewSet):
-    queryset = PaymentStatus.objects.filter(is_active=True)
+class PaymentStatusViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = PaymentStatus.objects.order_by('pk')
     serializer_class = PaymentStatusSerializer
 
 
-class PersonaViewSet(viewsets.ModelViewSet):
-    queryset = Persona.objects.filter(is_active=True)
+class PersonaViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Persona.objects.order_by('pk')
     serializer_class = PersonaSerializer
 
 
-class CompanyViewSet(viewsets.ModelViewSet):
-    queryset = Company.objects.filter(is_active=True)
+class CompanyViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Company.objects.order_by('pk')
     serializer_class = CompanySerializer
 
 
-class FiscalConditionViewSet(viewsets.ModelViewSet):
-    queryset = FiscalCondition.objects.filter(is_active=True)
+class FiscalConditionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = FiscalCondition.objects.order_by('pk')
     serializer_class = FiscalConditionSerializer
 
 
 
 
-class CardInfoViewSet(viewsets.ModelViewSet):
-    queryset = CardInfo.objects.filter(is_active=True)
+class CardInfoViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = CardInfo.objects.order_by('pk')
     serializer_class = CardInfoSerializer
 
 
-class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.filter(is_active=True).order_by('-created_at')
-    serializer_class = OrderSerializer
+class FinancingPlanViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = FinancingPlan.objects.order_by('pk')
+    serializer_class = FinancingPlanSerializer
+
 
+class InstallmentPlanViewSet(viewsets.ViewSet):
+    """Cotiza todas las opciones de cuotas de un carrito en una sola llamada."""
 
-class OrderDetailViewSet(viewsets.ModelViewSet):
-    queryset = OrderDetail.objects.filter(is_active=True)
+    def create(self, request):
+        serializer = InstallmentQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subtotal, missing = basket_subtotal(serializer.validated_data['items'])
+        if missing:
+            return Response(
+                {'items': [f'Producto inexistente: {pk}.' for pk in missing]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        payment_method = serializer.validated_data.get('payment_method')
+        plans = quote_plans(subtotal, payment_method.pk if payment_method is not None else None)
+        return Response({'subtotal': subtotal, 'plans': plans})
+
+
+class OrderViewSet(IdempotentCreateMixin, OptInPageNumberMixin, viewsets.ModelViewSet):
+    queryset = Order.objects.order_by('-created_at', '-id')
+    serializer_class = OrderSerializer
+    pagination_class = CreatedAtCursorPagination
+
+    item_prefetches = {
+        'standard_items': OrderDetail,
+        'card_items': OrderDetailCard,
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+
+        search = self.request.query_params.get('q')
+        if search:
+            queryset = order_search.filter(queryset, search)
+
+        # Solo se leen las columnas y tablas de items que pidió el cliente con
+        # ?fields= / ?expand=; los items se traen con una consulta por tabla
+        # para toda la página, sin importar cuántas órdenes tenga.
+        fields = self.get_serializer().fields
+        columns = {field.name for field in Order._meta.concrete_fields}
+        queryset = queryset.only(
+            'id', 'created_at', *(field.source for field in fields.values() if field.source in columns)
+        )
+        return queryset.prefetch_related(*(
+            Prefetch(name, queryset=model.objects.all())
+            for name, model in self.item_prefetches.items() if name in fields
+        ))
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Lectura de respaldo sobre el archivo para órdenes ya movidas.
+            pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+            archived = find_archived_order(pk=pk) if str(pk).isdigit() else None
+            if archived is None:
+                raise
+        response = Response(self.get_serializer(archived.to_order()).data)
+        response['X-Archived'] = 'true'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @idempotent
+    def bulk(self, request):
+        payload = request.data
+        if not isinstance(payload, list):
+            return Response(
+                {'detail': 'Se esperaba una lista de órdenes.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        max_batch = getattr(settings, 'ORDER_BULK_MAX_BATCH', 1000)
+        if len(payload) > max_batch:
+            return Response(
+                {'detail': f'El lote no puede superar {max_batch} órdenes.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        created, errors = ingest_orders(payload, request.user)
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
+    @action(detail=False, methods=['post'], url_path='transition')
+    @idempotent
+    def transition(self, request):
+        serializer = OrderTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated, skipped = transition_orders(
+            serializer.validated_data['ids'], serializer.validated_data['status'], user=request.user
+        )
+        return Response({'updated': updated, 'skipped': skipped})
+
+    @action(detail=False, methods=['get'], url_path='mine')
+    def mine(self, request):
+        # Siempre por cursor y solo con las columnas del resumen: la consulta
+        # se resuelve en order_user_active_created_idx sin tocar la tabla.
+        queryset = Order.objects.filter(user=request.user).only(*OrderSummarySerializer.Meta.fields)
+        paginator = CreatedAtCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(OrderSummarySerializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        # ?output= porque DRF reserva ?format= para elegir el renderer.
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'detail': f"output debe ser uno de: {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            filters = export_filters(request.query_params)
+        except ValueError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        render, content_type = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(
+            render(iter_order_rows(export_queryset(**filters))), content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="orders.{output}"'
+        return response
+
+
+class OrderDetailViewSet(IdempotentCreateMixin, OptInPageNumberMixin, viewsets.ModelViewSet):
+    queryset = OrderDetail.objects.order_by('-id')
     serializer_class = OrderDetailSerializer
+    pagination_class = IdCursorPagination
 
 
-class OrderDetailCardViewSet(viewsets.ModelViewSet):
-    queryset = OrderDetailCard.objects.filter(is_active=True)
+class OrderDetailCardViewSet(IdempotentCreateMixin, OptInPageNumberMixin, viewsets.ModelViewSet):
+    queryset = OrderDetailCard.objects.order_by('-id')
     serializer_class = OrderDetailCardSerializer
+    pagination_class = IdCursorPagination
@@ -1,8 +1,9 @@
 from django.contrib import admin
+from ecommers.admin import SoftDeleteAdminMixin
 from .models import Product, Audit
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'category', 'brand', 'stock', 'active')
     search_fields = ('name', 'description')
     list_filter = ('category', 'brand', 'active')
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from ecommers.background import background_task, run_in_background
+from ecommers.batching import CommitBatch
+
+CREATED, UPDATED, DELETED = 1, 2, 3
+VERBS = {CREATED: 'created', UPDATED: 'updated', DELETED: 'deleted'}
+
+
+def audit_entry(action_id, name, user_id):
+    """Entrada de auditoría de un producto (un dict: viaja tal cual a Celery)."""
+    return {
+        'user_id': user_id,
+        'action_id': action_id,
+        'affected_table': 'Product',
+        'description': f'Product "{name}" was {VERBS[action_id]}.',
+    }
+
+
+@background_task
+def write_audit_entries(entries, using=DEFAULT_DB_ALIAS):
+    from .models import Audit
+
+    Audit.objects.using(using).bulk_create(
+        [Audit(**entry) for entry in entries], batch_size=settings.AUDIT_BATCH_SIZE
+    )
+
+
+def flush_audit_entries(entries, using=DEFAULT_DB_ALIAS):
+    if settings.AUDIT_FLUSH_IN_BACKGROUND:
+        run_in_background(write_audit_entries, entries, using)
+    else:
+        write_audit_entries(entries, using)
+
+
+# Entradas de la transacción en curso: se escriben juntas al confirmarla.
+audit_buffer = CommitBatch(flush_audit_entries)
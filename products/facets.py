@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, F, Q
+
+from .models import Product, ProductFacetCount
+
+FACETS = ('category', 'brand', 'in_stock')
+IN_STOCK_LABELS = {True: 'Con stock', False: 'Sin stock'}
+
+
+def _in_stock():
+    return ExpressionWrapper(Q(stock__gt=0), output_field=BooleanField())
+
+
+def apply_facet_deltas(deltas, using='default'):
+    """Suma ``{(category, brand, active, in_stock): delta}`` a ProductFacetCount."""
+    counts = ProductFacetCount.objects.using(using)
+    for (category_id, brand_id, active, in_stock), delta in deltas.items():
+        if not delta:
+            continue
+        lookup = {'category_id': category_id, 'brand_id': brand_id, 'active': active, 'in_stock': in_stock}
+        # Sin fila previa solo se crea para sumar: restar de una fila que no
+        # existe es un conteo ya desfasado (o una categoría que se está borrando).
+        if not counts.filter(**lookup).update(count=F('count') + delta) and delta > 0:
+            counts.bulk_create([ProductFacetCount(**lookup)], ignore_conflicts=True)
+            counts.filter(**lookup).update(count=F('count') + delta)
+
+
+def refresh_product_facets(using='default', **lookup):
+    """Recalcula desde Product las filas que cumplen ``lookup`` (todas si no se pasa).
+
+    Para los cambios masivos que no disparan señales: bajas en cascada,
+    ``update()``, cargas con ``bulk_create``.
+    """
+    with transaction.atomic(using=using):
+        ProductFacetCount.objects.using(using).filter(**lookup).delete()
+        rows = (
+            Product.all_objects.using(using).filter(**lookup).order_by()
+            .annotate(in_stock=_in_stock())
+            .values('category_id', 'brand_id', 'active', 'in_stock')
+            .annotate(count=Count('pk'))
+        )
+        ProductFacetCount.objects.using(using).bulk_create(
+            [ProductFacetCount(**row) for row in rows], batch_size=1000
+        )
+
+
+def facet_rows(products=None):
+    """Filas ``category/brand/in_stock/count`` de productos activos, con los nombres.
+
+    Sin ``products`` salen de la tabla precalculada; con un queryset (por
+    ejemplo, los que coinciden con una búsqueda) se agrupa ese queryset.
+    """
+    columns = ('category_id', 'category__name', 'brand_id', 'brand__name', 'in_stock')
+    if products is None:
+        rows = ProductFacetCount.objects.filter(active=True, count__gt=0).values(*columns, 'count')
+    else:
+        rows = (
+            products.order_by().annotate(in_stock=_in_stock())
+            .values(*columns).annotate(count=Count('pk'))
+        )
+    return [
+        {
+            'category': row['category_id'], 'category_name': row['category__name'],
+            'brand': row['brand_id'], 'brand_name': row['brand__name'],
+            'in_stock': row['in_stock'], 'count': row['count'],
+        }
+        for row in rows
+    ]
+
+
+def count_facets(rows, **selected):
+    """Cantidades por valor de cada faceta para los filtros ``selected``.
+
+    Cada faceta se cuenta con los filtros de las otras, no con el suyo: así
+    se siguen viendo las demás categorías después de elegir una.
+    """
+    facets = {name: {} for name in FACETS}
+    for row in rows:
+        for name in FACETS:
+            if any(
+                selected.get(other) is not None and row[other] != selected[other]
+                for other in FACETS if other != name
+            ):
+                continue
+            value = row[name]
+            entry = facets[name].get(value)
+            if entry is None:
+                label = IN_STOCK_LABELS[value] if name == 'in_stock' else row[f'{name}_name']
+                entry = facets[name][value] = {
+                    'value': value, 'label': label, 'count': 0, 'selected': value == selected.get(name),
+                }
+            entry['count'] += row['count']
+    return {
+        name: sorted(values.values(), key=lambda entry: (-entry['count'], str(entry['label'])))
+        for name, values in facets.items()
+    }
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from products.facets import refresh_product_facets
+from products.models import ProductFacetCount
+
+
+class Command(BaseCommand):
+    help = "Recalcula la tabla de conteos de facetas de productos (products.facets)."
+
+    def handle(self, *args, **options):
+        refresh_product_facets()
+        self.stdout.write(self.style.SUCCESS(f"{ProductFacetCount.objects.count()} fila(s) de facetas."))
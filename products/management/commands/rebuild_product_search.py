@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.search import product_search
+
+
+class Command(BaseCommand):
+    help = "Vuelve a generar el índice de búsqueda de productos (products.search)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        indexed = product_search.rebuild(
+            Product.all_objects.all(), chunk_size=options['chunk_size'], stdout=self.stdout
+        )
+        self.stdout.write(self.style.SUCCESS(f"{indexed} producto(s) indexados."))
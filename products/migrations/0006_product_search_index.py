@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from ecommers.fulltext import RankedSearchIndex
+
+product_search = RankedSearchIndex('products_product_search', columns=[
+    ('name', 'name', 10.0),
+    ('brand', 'brand__name', 4.0),
+    ('category', 'category__name', 4.0),
+    ('description', 'description', 1.0),
+])
+
+
+def create_search_index(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    product_search.create(schema_editor.connection)
+    product_search.rebuild(Product._base_manager.using(schema_editor.connection.alias))
+
+
+def drop_search_index(apps, schema_editor):
+    product_search.drop(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_soft_delete_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.11 on 2026-10-18 21:28
+
+from django.db import migrations, models
+from django.db.models import BooleanField, Count, ExpressionWrapper, Q
+import django.db.models.deletion
+
+
+def count_facets(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductFacetCount = apps.get_model('products', 'ProductFacetCount')
+    using = schema_editor.connection.alias
+    rows = (
+        Product._base_manager.using(using).order_by()
+        .annotate(in_stock=ExpressionWrapper(Q(stock__gt=0), output_field=BooleanField()))
+        .values('category_id', 'brand_id', 'active', 'in_stock')
+        .annotate(count=Count('pk'))
+    )
+    ProductFacetCount.objects.using(using).bulk_create(
+        [ProductFacetCount(**row) for row in rows], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0002_soft_delete_indexes'),
+        ('products', '0006_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active', models.BooleanField()),
+                ('in_stock', models.BooleanField()),
+                ('count', models.IntegerField(default=0)),
+                ('brand', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='categories.brand')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='categories.category')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='productfacetcount',
+            constraint=models.UniqueConstraint(fields=('category', 'brand', 'active', 'in_stock'), name='product_facet_unique'),
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,75 @@
-from django.db import models
+from django.db import models, transaction
 from categories.models import Category, Brand
 from django.contrib.auth.models import User
+from ecommers.soft_delete import SoftDeleteManager, SoftDeleteMixin, SoftDeleteQuerySet
+from ecommers.versions import bump_table_version
+from .audit import CREATED, DELETED, UPDATED, audit_buffer, audit_entry
+from .search import PRODUCT_SEARCH_FIELDS, product_search
 
-class Product(models.Model):
+
+class ProductQuerySet(SoftDeleteQuerySet):
+    """``update()`` y ``bulk_create()`` no disparan señales: la auditoría, el
+    conteo de facetas, el índice de búsqueda y la versión del catálogo se
+    mantienen acá (ver products.audit, products.facets, products.search y
+    ecommers.versions).
+    """
+
+    # Columnas de ``update()`` que mueven filas entre facetas.
+    facet_columns = ('category', 'category_id', 'brand', 'brand_id', 'active', 'stock')
+    # Columnas de ``update()`` que cambian el texto indexado.
+    search_columns = PRODUCT_SEARCH_FIELDS + ('category_id', 'brand_id')
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            changed = self
+            if not any(hasattr(value, 'resolve_expression') for value in kwargs.values()):
+                # Con valores fijos, solo se auditan las filas que realmente cambian.
+                changed = self.exclude(**kwargs)
+            rows = list(changed.order_by().values_list('pk', 'name', 'user_id', 'category_id'))
+            updated = super().update(**kwargs)
+            action = DELETED if kwargs == {self.model.soft_delete_field: False} else UPDATED
+            audit_buffer.add([audit_entry(action, name, user_id) for _, name, user_id, _ in rows], using=self.db)
+            pks = [pk for pk, *_ in rows]
+            if rows and set(kwargs) & set(self.facet_columns):
+                category_ids = {category_id for *_, category_id in rows}
+                if {'category', 'category_id'} & set(kwargs):
+                    category_ids.update(
+                        self.model._base_manager.using(self.db)
+                        .filter(pk__in=pks).values_list('category_id', flat=True)
+                    )
+                self._refresh_facets(category_ids)
+            if rows and set(kwargs) & set(self.search_columns):
+                product_search.index(self.model._base_manager.using(self.db).filter(pk__in=pks))
+            if updated:
+                bump_table_version(self.model, using=self.db)
+        return updated
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            audit_buffer.add([audit_entry(CREATED, obj.name, obj.user_id) for obj in objs], using=self.db)
+            self._refresh_facets({obj.category_id for obj in objs})
+            # Sin RETURNING las filas no traen pk; con conflictos pueden ya estar indexadas.
+            pks = [obj.pk for obj in objs if obj.pk is not None]
+            if pks:
+                product_search.index(
+                    self.model._base_manager.using(self.db).filter(pk__in=pks),
+                    replace=bool(kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts')),
+                )
+            if objs:
+                bump_table_version(self.model, using=self.db)
+        return objs
+
+    def _refresh_facets(self, category_ids):
+        from .facets import refresh_product_facets
+
+        if category_ids:
+            refresh_product_facets(using=self.db, category_id__in=category_ids)
+
+
+class Product(SoftDeleteMixin, models.Model):
     name = models.CharField(max_length=100)
     brand = models.ForeignKey(Brand, on_delete=models.CASCADE, related_name='products')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
@@ -14,13 +81,91 @@ class Product(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
+    objects = SoftDeleteManager.from_queryset(ProductQuerySet)()
+    all_objects = ProductQuerySet.as_manager()
+
+    soft_delete_field = 'active'
+
+    class Meta:
+        # Parciales: los listados solo leen productos activos.
+        indexes = [
+            models.Index(fields=['-date'], name='product_active_date_idx', condition=models.Q(active=True)),
+            models.Index(fields=['category'], name='product_active_category_idx', condition=models.Q(active=True)),
+            models.Index(fields=['brand'], name='product_active_brand_idx', condition=models.Q(active=True)),
+        ]
+
     def __str__(self):
         return self.name
 
+    # Columnas que definen la fila de ProductFacetCount (ver products.facets).
+    facet_fields = ('category_id', 'brand_id', 'active', 'stock')
+    # Columnas cuyo cambio deja una entrada de auditoría (ver products.signals).
+    audited_fields = (
+        'name', 'brand_id', 'category_id', 'description', 'image', 'active', 'stock', 'min_stock', 'user_id',
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if all(name in loaded for name in cls.facet_fields):
+            instance._stored_facet = cls.facet_key(loaded)
+        instance._stored_values = {name: loaded[name] for name in cls.audited_fields if name in loaded}
+        return instance
+
+    def _audited_names(self, update_fields=None):
+        if update_fields is None:
+            return self.audited_fields
+        names = {self._meta.get_field(name).attname for name in update_fields}
+        return [name for name in self.audited_fields if name in names]
+
+    def changed_fields(self, update_fields=None):
+        """Columnas auditadas que difieren de lo último leído o guardado.
+
+        Lo que no se conoce (instancias armadas a mano, campos diferidos)
+        cuenta como cambiado.
+        """
+        stored = getattr(self, '_stored_values', {})
+        return [
+            name for name in self._audited_names(update_fields)
+            if name not in stored or stored[name] != getattr(self, name)
+        ]
+
+    def remember_audited_values(self, update_fields=None):
+        stored = getattr(self, '_stored_values', {})
+        stored.update({name: getattr(self, name) for name in self._audited_names(update_fields)})
+        self._stored_values = stored
+
+    @staticmethod
+    def facet_key(values):
+        return values['category_id'], values['brand_id'], values['active'], values['stock'] > 0
+
+    def current_facet_key(self):
+        return self.facet_key({name: getattr(self, name) for name in self.facet_fields})
+
     @property
     def is_below_min_stock(self):
         return self.stock < self.min_stock
 
+class ProductFacetCount(models.Model):
+    """Cantidad de productos por combinación de facetas, mantenida por products.signals."""
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, related_name='+')
+    active = models.BooleanField()
+    in_stock = models.BooleanField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category', 'brand', 'active', 'in_stock'], name='product_facet_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id}/{self.brand_id}/{self.active}/{self.in_stock}: {self.count}"
+
 class Audit(models.Model):
     ACTION_CHOICES = (
         (1, 'CREATED'),
@@ -0,0 +1,12 @@
+from ecommers.fulltext import RankedSearchIndex
+
+# (columna, campo, peso): el nombre pesa más que la marca/categoría y que la descripción.
+PRODUCT_SEARCH_COLUMNS = [
+    ('name', 'name', 10.0),
+    ('brand', 'brand__name', 4.0),
+    ('category', 'category__name', 4.0),
+    ('description', 'description', 1.0),
+]
+PRODUCT_SEARCH_FIELDS = ('name', 'brand', 'category', 'description')
+
+product_search = RankedSearchIndex('products_product_search', columns=PRODUCT_SEARCH_COLUMNS)
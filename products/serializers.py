@@ -1,18 +1,24 @@
 from rest_framework import serializers
+from ecommers.serializers import SparseFieldsetMixin
 from .models import Product
 from categories.models import Category, Brand
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name']
 
-class BrandSerializer(serializers.ModelSerializer):
+class BrandSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Brand
-        fields = ['id', 'name', 'image']
+        fields = ['id', 'name', 'logo']
 
-class ProductSerializer(serializers.ModelSerializer):
+class BrandSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Brand
+        fields = ['id', 'name']
+
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     brand = BrandSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     brand_id = serializers.PrimaryKeyRelatedField(queryset=Brand.objects.all(), source='brand', write_only=True)
@@ -25,3 +31,11 @@ class ProductSerializer(serializers.ModelSerializer):
             'stock', 'min_stock', 'date', 'user',
             'brand', 'category', 'brand_id', 'category_id'
         ]
+
+class ProductListSerializer(ProductSerializer):
+    """Listado: sin ``description`` ni ``image`` y con la marca sin logo."""
+
+    brand = BrandSummarySerializer(read_only=True)
+
+    class Meta(ProductSerializer.Meta):
+        fields = ['id', 'name', 'active', 'stock', 'min_stock', 'date', 'brand', 'category']
@@ -1,23 +1,109 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from .models import Product, Audit
+from categories.models import Brand, Category
+from ecommers.versions import bump_table_version
+from .facets import apply_facet_deltas, refresh_product_facets
+from .audit import CREATED, DELETED, UPDATED, audit_buffer, audit_entry
+from .models import Product
+from .search import PRODUCT_SEARCH_FIELDS, product_search
 from django.contrib.auth.models import User
 
+# -------- AUDITORÍA -------- #
+# Las entradas se juntan por transacción y se escriben con un bulk_create al
+# confirmar (products.audit). Un save que no cambia nada no se audita.
+
+@receiver(post_save, sender=Product)
+def log_product_save(sender, instance, created, update_fields=None, using=None, **kwargs):
+    if created:
+        action = CREATED
+    elif not instance.changed_fields(update_fields):
+        return
+    # delete() es una baja lógica (save del campo active): se registra como borrado.
+    elif update_fields is not None and set(update_fields) == {'active'} and not instance.active:
+        action = DELETED
+    else:
+        action = UPDATED
+    audit_buffer.add([audit_entry(action, instance.name, instance.user_id)], using=using)
+    instance.remember_audited_values(None if created else update_fields)
+
+@receiver(post_delete, sender=Product)
+def log_product_delete(sender, instance, using=None, **kwargs):
+    audit_buffer.add([audit_entry(DELETED, instance.name, instance.user_id)], using=using)
+
+
+# -------- ÍNDICE DE BÚSQUEDA DE PRODUCTOS -------- #
+# Las bajas lógicas no cambian el índice: los listados ya filtran por ``active``.
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(set(update_fields) & set(fields))
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, created=False, update_fields=None, using=None, **kwargs):
+    if created or _touches(update_fields, PRODUCT_SEARCH_FIELDS):
+        product_search.index(Product._base_manager.using(using).filter(pk=instance.pk), replace=not created)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, using=None, **kwargs):
+    product_search.remove([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def reindex_related_products(sender, instance, created=False, update_fields=None, using=None, **kwargs):
+    if not created and _touches(update_fields, ('name',)):
+        field = 'brand' if sender is Brand else 'category'
+        product_search.index(Product._base_manager.using(using).filter(**{field: instance.pk}))
+
+
+# -------- CONTEO DE FACETAS -------- #
+# ProductFacetCount se ajusta con deltas; las bajas en cascada de categorías
+# y marcas (un UPDATE, sin señales por producto) recalculan sus filas.
+
+@receiver(pre_save, sender=Product)
+def remember_product_facet(sender, instance, using=None, update_fields=None, **kwargs):
+    if instance._state.adding or not _touches(update_fields, Product.facet_fields + ('category', 'brand')):
+        instance._previous_facet = None
+        return
+    previous = getattr(instance, '_stored_facet', None)
+    if previous is None:
+        values = Product._base_manager.using(using).filter(pk=instance.pk).values(*Product.facet_fields).first()
+        previous = Product.facet_key(values) if values is not None else None
+    instance._previous_facet = previous
+
+
 @receiver(post_save, sender=Product)
-def log_product_save(sender, instance, created, **kwargs):
-    action = 1 if created else 2
-    Audit.objects.create(
-        user=instance.user,
-        action_id=action,
-        affected_table='Product',
-        description=f'Product "{instance.name}" was {"created" if created else "updated"}.'
-    )
+def count_product_facet(sender, instance, created=False, update_fields=None, using=None, **kwargs):
+    if not created and not _touches(update_fields, Product.facet_fields + ('category', 'brand')):
+        return
+    previous, current = getattr(instance, '_previous_facet', None), instance.current_facet_key()
+    if previous == current:
+        return
+    deltas = {current: 1}
+    if previous is not None:
+        deltas[previous] = -1
+    apply_facet_deltas(deltas, using=using)
+    instance._stored_facet = current
+
 
 @receiver(post_delete, sender=Product)
-def log_product_delete(sender, instance, **kwargs):
-    Audit.objects.create(
-        user=instance.user,
-        action_id=3,
-        affected_table='Product',
-        description=f'Product "{instance.name}" was deleted.'
-    )
+def uncount_product_facet(sender, instance, using=None, **kwargs):
+    apply_facet_deltas({instance.current_facet_key(): -1}, using=using)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def refresh_related_facets(sender, instance, created=False, update_fields=None, using=None, **kwargs):
+    if not created and _touches(update_fields, ('active',)):
+        field = 'brand' if sender is Brand else 'category'
+        refresh_product_facets(using=using, **{field: instance.pk})
+
+
+# -------- VERSIÓN DEL CATÁLOGO -------- #
+# Invalida las respuestas cacheadas del catálogo (ecommers.response_cache).
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_product_version(sender, using=None, **kwargs):
+    bump_table_version(sender, using=using)
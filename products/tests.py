@@ -1,3 +1,382 @@
-from django.test import TestCase
+from django.db import connection, transaction
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from categories.models import Brand, Category
+from ecommers.response_cache import get_or_compute
+from .facets import count_facets, facet_rows, refresh_product_facets
+from .models import Audit, Product, ProductFacetCount
+from .search import product_search
+from .views import ProductListView
+
+
+class ProductSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mates = Category.objects.create(name='Mates')
+        cls.termos = Category.objects.create(name='Termos')
+        cls.brand = Brand.objects.create(name='Pampa')
+        cls.gourd = Product.objects.create(
+            name='Mate de calabaza', brand=cls.brand, category=cls.mates,
+            description='Curado a mano.',
+        )
+        cls.thermos = Product.objects.create(
+            name='Termo acero', brand=cls.brand, category=cls.termos,
+            description='Ideal para el mate, mantiene el agua caliente.',
+        )
+
+    def setUp(self):
+        # Las versiones del catálogo viven en la cache y no vuelven atrás con
+        # el rollback de cada test.
+        cache.clear()
+
+    def search(self, text, **params):
+        request = RequestFactory().get('/', {'search': text, **params})
+        view = ProductListView()
+        view.setup(request)
+        return list(view.get_queryset())
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('mate'), [self.gourd, self.thermos])
+
+    def test_prefix_and_accents(self):
+        self.assertEqual(self.search('calabazá'), [self.gourd])
+        self.assertEqual(self.search('term'), [self.thermos])
+        self.assertEqual(self.search('mat ter'), [self.thermos])
+        self.assertEqual(self.search('mate de calabaza'), [self.gourd])
+
+    def test_category_filter_and_no_match(self):
+        self.assertEqual(self.search('mate', category=self.termos.pk), [self.thermos])
+        self.assertEqual(self.search('yerba'), [])
+
+    def test_index_follows_writes(self):
+        self.gourd.name = 'Mate imperial'
+        self.gourd.save()
+        self.assertEqual(self.search('imperial'), [self.gourd])
+        self.brand.name = 'Rústica'
+        self.brand.save()
+        self.assertEqual(len(self.search('rustica')), 2)
+        self.gourd.delete()
+        self.assertEqual(self.search('imperial'), [])
+        thermos_pk = self.thermos.pk
+        self.thermos.hard_delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {product_search._key(connection)} FROM {product_search.table}')
+            self.assertNotIn((thermos_pk,), cursor.fetchall())
+
+    def test_bulk_writes_are_indexed(self):
+        Product.objects.bulk_create([Product(name='Bombilla alpaca', brand=self.brand, category=self.mates)])
+        self.assertEqual([product.name for product in self.search('alpaca')], ['Bombilla alpaca'])
+        Product.objects.filter(pk=self.thermos.pk).update(name='Yerba')
+        self.assertEqual(self.search('yerba'), [self.thermos])
+        self.assertEqual(self.search('acero'), [])
+
+
+class ProductFacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mates = Category.objects.create(name='Mates')
+        cls.termos = Category.objects.create(name='Termos')
+        cls.pampa = Brand.objects.create(name='Pampa')
+        cls.andes = Brand.objects.create(name='Andes')
+
+    def setUp(self):
+        cache.clear()
+
+    def create(self, name, category, brand, stock=1):
+        return Product.objects.create(name=name, category=category, brand=brand, stock=stock)
+
+    def counts(self, **selected):
+        facets = count_facets(facet_rows(), **selected)
+        return {name: {entry['value']: entry['count'] for entry in entries} for name, entries in facets.items()}
+
+    def snapshot(self):
+        return set(ProductFacetCount.objects.filter(count__gt=0).values_list(
+            'category_id', 'brand_id', 'active', 'in_stock', 'count'
+        ))
+
+    def test_counts_follow_product_writes(self):
+        gourd = self.create('Mate', self.mates, self.pampa)
+        self.create('Mate chico', self.mates, self.andes, stock=0)
+        thermos = self.create('Termo', self.termos, self.pampa)
+        gourd.stock = 0
+        gourd.save()
+        thermos.category = self.mates
+        thermos.save()
+        self.create('Borrado', self.termos, self.andes).delete()
+        self.assertEqual(self.counts(), {
+            'category': {self.mates.pk: 3},
+            'brand': {self.pampa.pk: 2, self.andes.pk: 1},
+            'in_stock': {True: 1, False: 2},
+        })
+        expected = self.snapshot()
+        refresh_product_facets()
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_each_facet_ignores_its_own_filter(self):
+        self.create('Mate', self.mates, self.pampa)
+        self.create('Mate chico', self.mates, self.andes)
+        self.create('Termo', self.termos, self.pampa)
+        counts = self.counts(category=self.mates.pk)
+        self.assertEqual(counts['category'], {self.mates.pk: 2, self.termos.pk: 1})
+        self.assertEqual(counts['brand'], {self.pampa.pk: 1, self.andes.pk: 1})
+
+    def test_category_soft_delete_refreshes_counts(self):
+        self.create('Termo', self.termos, self.pampa)
+        self.create('Mate', self.mates, self.pampa)
+        self.termos.delete()
+        self.assertEqual(self.counts()['category'], {self.mates.pk: 1})
+
+    def test_bulk_writes_refresh_counts(self):
+        Product.objects.bulk_create([
+            Product(name='Mate', category=self.mates, brand=self.pampa, stock=1),
+            Product(name='Termo', category=self.termos, brand=self.pampa, stock=1),
+        ])
+        self.assertEqual(self.counts()['category'], {self.mates.pk: 1, self.termos.pk: 1})
+        Product.objects.filter(name='Mate').update(stock=0)
+        self.assertEqual(self.counts()['in_stock'], {True: 1, False: 1})
+        Product.objects.filter(name='Termo').update(category=self.mates)
+        self.assertEqual(self.counts()['category'], {self.mates.pk: 2})
+        expected = self.snapshot()
+        refresh_product_facets()
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_list_view_returns_results_and_facets(self):
+        self.create('Mate de calabaza', self.mates, self.pampa)
+        self.create('Termo de acero', self.termos, self.pampa, stock=0)
+        self.create('Bombilla de acero', self.mates, self.andes)
+        request = RequestFactory().get('/', {'search': 'acero', 'category': self.mates.pk})
+        view = ProductListView()
+        view.setup(request)
+        view.object_list = view.get_queryset()
+        with self.assertNumQueries(1):
+            facets = view.get_facets()
+        self.assertEqual([product.name for product in view.object_list], ['Bombilla de acero'])
+        self.assertEqual({entry['label']: entry['count'] for entry in facets['category']}, {'Mates': 1, 'Termos': 1})
+        self.assertEqual([entry['label'] for entry in facets['brand']], ['Andes'])
+        self.assertTrue(facets['category'][0]['selected'] or facets['category'][1]['selected'])
+
+
+class ProductListPageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Mates')
+        brand = Brand.objects.create(name='Pampa')
+        Product.objects.bulk_create([
+            Product(name=f'Mate {number}', brand=brand, category=category) for number in range(30)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def page(self, **params):
+        view = ProductListView()
+        view.setup(RequestFactory().get('/', params))
+        return view.paginate_queryset(view.get_queryset(), view.paginate_by)
+
+    def test_only_the_requested_page_is_cached(self):
+        paginator, page, rows, is_paginated = self.page(page=2)
+        self.assertEqual((paginator.count, len(rows), is_paginated), (30, 6, True))
+        with self.assertNumQueries(0):
+            paginator, page, cached_rows, _ = self.page(page=2)
+        self.assertEqual(cached_rows, rows)
+        self.assertEqual((paginator.num_pages, page.number), (2, 2))
+
+    def test_pages_are_ordered_newest_first(self):
+        _, _, rows, _ = self.page()
+        self.assertEqual(rows, list(Product.objects.order_by('-date', '-id')[:24]))
+
+    def test_bulk_writes_invalidate_the_cached_pages(self):
+        self.page()
+        Product.objects.update(stock=7)
+        _, _, rows, _ = self.page()
+        self.assertEqual({product.stock for product in rows}, {7})
+        Product.objects.bulk_create([
+            Product(name='Termo', brand=rows[0].brand, category=rows[0].category)
+        ])
+        paginator, *_ = self.page()
+        self.assertEqual(paginator.count, 31)
+
+
+class ProductApiTests(TestCase):
+    url = '/api/products/api/products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='cliente', password='secreto')
+        cls.category = Category.objects.create(name='Mates')
+        cls.brand = Brand.objects.create(name='Pampa', logo='data:image/png;base64,AAAA')
+        Product.objects.bulk_create([
+            Product(name=f'Mate {number}', brand=cls.brand, category=cls.category, description='x' * 500)
+            for number in range(120)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_one_slim_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'page_size': 100})
+        rows = response.data['results']
+        self.assertEqual(len(rows), 100)
+        self.assertNotIn('description', rows[0])
+        self.assertEqual(rows[0]['brand'], {'id': self.brand.pk, 'name': 'Pampa'})
+        self.assertEqual(rows[0]['category'], {'id': self.category.pk, 'name': 'Mates'})
+        next_page = self.client.get(response.data['next'])
+        self.assertEqual(len(next_page.data['results']), 20)
+
+    def test_sparse_fields_and_detail(self):
+        response = self.client.get(self.url, {'fields': 'id,brand.name'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'brand'})
+        self.assertEqual(response.data['results'][0]['brand'], {'name': 'Pampa'})
+        pk = response.data['results'][0]['id']
+        detail = self.client.get(f'{self.url}{pk}/')
+        self.assertEqual(detail.data['description'], 'x' * 500)
+        self.assertEqual(detail.data['brand']['logo'], self.brand.logo)
+
+    def test_create_and_soft_delete(self):
+        response = self.client.post(self.url, {
+            'name': 'Termo', 'brand_id': self.brand.pk, 'category_id': self.category.pk, 'stock': 3,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.delete(f"{self.url}{response.data['id']}/").status_code, 204)
+        self.assertFalse(Product.all_objects.get(pk=response.data['id']).active)
+
+    def test_responses_are_cached_until_the_catalog_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(len(cached.data['results']), 20)
+        self.brand.name = 'Andes'
+        self.brand.save()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['results'][0]['brand']['name'], 'Andes')
+
+    def test_category_and_brand_lists(self):
+        response = self.client.get('/api/categories/categories/')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Mates'])
+        self.client.get('/api/categories/brands/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/categories/brands/')
+        self.assertEqual(response.data['results'][0]['logo'], self.brand.logo)
+
+
+class SingleFlightCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.keys = ('catalog:test:v2', 'catalog:test:latest')
+
+    def test_other_workers_get_the_stale_copy_while_one_recomputes(self):
+        cache.set(self.keys[1], 'anterior')
+        cache.add(f'{self.keys[0]}:lock', True)
+        self.assertEqual(get_or_compute(self.keys, lambda: self.fail('no debería recalcular')), 'anterior')
+
+    @override_settings(CATALOG_CACHE_WAIT=0)
+    def test_without_a_copy_it_computes_after_waiting(self):
+        cache.add(f'{self.keys[0]}:lock', True)
+        self.assertEqual(get_or_compute(self.keys, lambda: 'nuevo'), 'nuevo')
+
+    def test_lock_holder_stores_both_keys(self):
+        self.assertEqual(get_or_compute(self.keys, lambda: 'nuevo'), 'nuevo')
+        self.assertEqual(cache.get_many(self.keys), {self.keys[0]: 'nuevo', self.keys[1]: 'nuevo'})
+        self.assertIsNone(cache.get(f'{self.keys[0]}:lock'))
+
+
+class ProductAuditTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='admin', password='secreto')
+        cls.category = Category.objects.create(name='Mates')
+        cls.brand = Brand.objects.create(name='Pampa')
+
+    def setUp(self):
+        cache.clear()
+
+    def create(self, name, **fields):
+        return Product.objects.create(name=name, brand=self.brand, category=self.category, user=self.user, **fields)
+
+    def trail(self):
+        return list(Audit.objects.order_by('pk').values_list('action_id', 'description'))
+
+    def test_transaction_is_flushed_with_one_insert_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                gourd = self.create('Mate')
+                self.create('Termo')
+                gourd.stock = 5
+                gourd.save()
+                gourd.delete()
+        self.assertEqual(self.trail(), [])
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        # delete() abre su savepoint: dos grupos, pero un solo INSERT.
+        inserts = [query for query in queries.captured_queries if 'INSERT INTO "products_audit"' in query['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.trail(), [
+            (1, 'Product "Mate" was created.'),
+            (1, 'Product "Termo" was created.'),
+            (2, 'Product "Mate" was updated.'),
+            (3, 'Product "Mate" was deleted.'),
+        ])
+
+    def test_rolled_back_savepoint_drops_its_entries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.create('Mate')
+                try:
+                    with transaction.atomic():
+                        self.create('Termo')
+                        raise ValueError
+                except ValueError:
+                    pass
+                self.create('Bombilla')
+        self.assertEqual([description for _, description in self.trail()], [
+            'Product "Mate" was created.', 'Product "Bombilla" was created.',
+        ])
+
+    def test_saves_without_changes_are_not_audited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            gourd = self.create('Mate', stock=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            gourd.save()
+            Product.objects.get(pk=gourd.pk).save()
+            gourd.stock = 3
+            gourd.save(update_fields=['date'])
+            gourd.save(update_fields=['stock'])
+            gourd.save()
+        self.assertEqual([action for action, _ in self.trail()], [1, 2])
+
+    def test_bulk_paths_are_audited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.bulk_create([
+                Product(name=name, brand=self.brand, category=self.category, stock=stock)
+                for name, stock in (('Mate', 0), ('Termo', 4), ('Bombilla', 0))
+            ])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Product.objects.update(stock=4), 3)
+            Product.objects.filter(name='Bombilla').delete()
+        self.assertEqual(self.trail()[3:], [
+            (2, 'Product "Mate" was updated.'),
+            (2, 'Product "Bombilla" was updated.'),
+            (3, 'Product "Bombilla" was deleted.'),
+        ])
+        self.assertEqual(Audit.objects.filter(action_id=1).count(), 3)
+
+    @override_settings(AUDIT_FLUSH_IN_BACKGROUND=True, BACKGROUND_TASKS_EAGER=True)
+    def test_background_flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create('Mate')
+        self.assertEqual(self.trail(), [(1, 'Product "Mate" was created.')])
+        self.assertEqual(Audit.objects.get().user, self.user)
@@ -1,26 +1,125 @@
-from categories.models import Category
+from django.core.paginator import Page
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from rest_framework import viewsets
+from categories.models import Brand, Category
+from ecommers.pagination import DateCursorPagination
+from ecommers.response_cache import CachedResponseMixin, get_or_compute, versioned_key
+from products.facets import count_facets, facet_rows
 from products.models import Product
+from products.search import product_search
+from products.serializers import ProductListSerializer, ProductSerializer
+
+
+# Tablas que invalidan las respuestas cacheadas del catálogo.
+CATALOG_MODELS = (Product, Category, Brand)
 
 
 class ProductListView(ListView):
     model = Product
     template_name = 'products/product_list.html'
     context_object_name = 'products'
+    paginate_by = 24
+
+    def cached(self, name, compute):
+        keys = versioned_key(f'product_list:{name}', CATALOG_MODELS, self.request.get_full_path())
+        return get_or_compute(keys, compute)
+
+    def selected_facets(self):
+        params = self.request.GET
+        selected = {}
+        for name in ('category', 'brand'):
+            if params.get(name, '').isdigit():
+                selected[name] = int(params[name])
+        if params.get('in_stock') in ('0', '1'):
+            selected['in_stock'] = params['in_stock'] == '1'
+        return selected
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        query = self.request.GET.get('search')
-        category = self.request.GET.get('category')
+        query = self.request.GET.get('search', '').strip()
+        selected = self.selected_facets()
+        if 'category' in selected:
+            queryset = queryset.filter(category__id=selected['category'])
+        if 'brand' in selected:
+            queryset = queryset.filter(brand__id=selected['brand'])
+        if 'in_stock' in selected:
+            queryset = queryset.filter(stock__gt=0) if selected['in_stock'] else queryset.filter(stock=0)
         if query:
-            queryset = queryset.filter(Q(name__icontains=query) | Q(description__icontains=query))
-        if category:
-            queryset = queryset.filter(category__id=category)
+            # Índice de products.search, ordenado por relevancia.
+            queryset = product_search.search(queryset, query)
+        else:
+            # Orden estable para paginar; sigue a product_active_date_idx.
+            queryset = queryset.order_by('-date', '-id')
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        # Se cachea solo la página pedida (sus filas y el total), no el catálogo.
+        def compute():
+            paginator, page, rows, _ = super(ProductListView, self).paginate_queryset(queryset, page_size)
+            return paginator.count, page.number, list(rows)
+
+        count, number, rows = self.cached('products', compute)
+        paginator = self.get_paginator(queryset, page_size, allow_empty_first_page=self.get_allow_empty())
+        paginator.count = count
+        page = Page(rows, number, paginator)
+        return paginator, page, rows, page.has_other_pages()
+
+    def get_facets(self):
+        return self.cached('facets', self.compute_facets)
+
+    def compute_facets(self):
+        # Una sola consulta: la tabla precalculada, o un GROUP BY sobre lo que
+        # coincide con la búsqueda (sin los filtros de facetas).
+        query = self.request.GET.get('search', '')
+        if not query.strip():
+            rows = facet_rows()
+        else:
+            rows = facet_rows(product_search.filter(Product.objects.all(), query))
+        return count_facets(rows, **self.selected_facets())
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
+        context['facets'] = self.get_facets()
+        context['categories'] = context['facets']['category']
         context['search'] = self.request.GET.get('search', '')
         context['selected_category'] = self.request.GET.get('category', '')
         return context
+
+
+class ProductViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    """Catálogo por API: el listado usa ``ProductListSerializer`` y trae marca y
+    categoría en la misma consulta, con solo las columnas que se serializan.
+    """
+
+    queryset = Product.objects.all()
+    cache_models = CATALOG_MODELS
+    serializer_class = ProductSerializer
+    pagination_class = DateCursorPagination
+    related_fields = {'brand': ('id', 'name', 'logo'), 'category': ('id', 'name')}
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProductListSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        for name in ('category', 'brand'):
+            if params.get(name, '').isdigit():
+                queryset = queryset.filter(**{f'{name}_id': params[name]})
+        if self.request.method != 'GET':
+            return queryset
+
+        # Con ?fields= se leen solo las columnas pedidas; las relaciones van
+        # con JOIN y solo con los campos de su serializer.
+        fields = self.get_serializer().fields
+        columns = {field.name for field in Product._meta.concrete_fields} - set(self.related_fields)
+        related = [name for name in self.related_fields if name in fields]
+        return queryset.select_related(*related).only(
+            'id', 'date', *(field.source for field in fields.values() if field.source in columns),
+            *(
+                f'{name}__{column}' for name in related
+                for column in self.related_fields[name] if column in fields[name].fields
+            ),
+        )